@@ -1,7 +1,9 @@
+import logging
 import os
+from contextlib import asynccontextmanager
 
 import sentry_sdk
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 
 
 def get_config():
@@ -23,14 +25,82 @@ def create_app():
             profiles_sample_rate=config.SENTRY_SAMPLE_RATE,
         )
 
-    app = FastAPI(title="ETNA Search API", log_level=config.LOG_LEVEL)
+    # Uvicorn and gunicorn only configure their own loggers, so the app's
+    # need a handler for anything to be seen, such as the per-request log
+    logger = logging.getLogger("app")
+    logger.setLevel(config.LOG_LEVEL.upper())
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(
+            logging.Formatter("%(levelname)s:\t%(name)s - %(message)s")
+        )
+        logger.addHandler(handler)
+        logger.propagate = False
+
+    from .lib.api import UpstreamError, UpstreamUnavailable
+    from .lib.cache import caches
+    from .lib.metrics import MetricsMiddleware
+    from .lib.metrics import render as render_metrics
+    from .lib.responses import GZipMiddleware, JSONResponse
+    from .lib.timing import TimingMiddleware
+    from .lib.upstreams import close_upstreams, open_upstreams
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from .sources.website import article_filters
+
+        open_upstreams(config)
+        await article_filters.start(config.ARTICLE_FILTERS_REFRESH_INTERVAL)
+        yield
+        await article_filters.stop()
+        await close_upstreams()
+
+    app = FastAPI(
+        title="ETNA Search API", log_level=config.LOG_LEVEL, lifespan=lifespan
+    )
     app.state.config = config
     base_uri = "/api/v1"
+    # Responses we cache are compressed ahead of this, see payload_response
+    app.add_middleware(
+        GZipMiddleware,
+        minimum_size=config.COMPRESSION_MIN_SIZE,
+        compresslevel=config.GZIP_COMPRESSION_LEVEL,
+        # Exports are streamed a batch at a time, which gzip would hold back
+        exclude_paths={f"{base_uri}/records/export/"},
+    )
+    # Outermost, so the timings include compression
+    app.add_middleware(TimingMiddleware, server_timing=config.SERVER_TIMING)
+    app.add_middleware(MetricsMiddleware)
 
     @app.get("/healthcheck/live/", include_in_schema=False)
     def healthcheck():
         return {"status": "ok"}
 
+    @app.get("/healthcheck/caches/", include_in_schema=False)
+    def cache_stats():
+        return {name: cache.stats() for name, cache in caches.items()}
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return Response(
+            render_metrics(), media_type="text/plain; version=0.0.4"
+        )
+
+    @app.exception_handler(UpstreamUnavailable)
+    async def upstream_unavailable(request: Request, exc: UpstreamUnavailable):
+        return JSONResponse(
+            {"detail": str(exc)},
+            status_code=503,
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.exception_handler(UpstreamError)
+    async def upstream_error(request: Request, exc: UpstreamError):
+        # The error can describe the upstream, which clients needn't see
+        return JSONResponse(
+            {"detail": "The upstream API request failed"}, status_code=502
+        )
+
     from .articles import routes as article_routes
     from .records import routes as record_routes
 
@@ -1,17 +1,24 @@
 from app.articles import router
+from app.lib.responses import Payload, model_response
 from app.schemas import Filter
 from app.sources.website import WebsiteArticles, get_time_periods, get_topics
+from fastapi import Request, Response
+
+from app import get_config
 
 from .schemas import ArticleSearchResults
 
+config = get_config()
+
 
-@router.get("/")
+@router.get("/", response_model=ArticleSearchResults)
 async def index(
+    request: Request,
     q: str | None = None,
     type: str | None = None,
     order: str | None = None,
     page: int | None = 1,
-) -> ArticleSearchResults:
+) -> Response:
     website_api = WebsiteArticles()
     website_api.params = {}  # TODO: Why are params persisting?
     if q:
@@ -40,5 +47,10 @@ async def index(
         website_api.add_parameter("order", "-first_published_at")
     elif order == "date:asc":
         website_api.add_parameter("order", "first_published_at")
-    results = website_api.get_result(page)
-    return results
+    results = await website_api.get_result_async(page)
+    return model_response(
+        request,
+        Payload(results),
+        ArticleSearchResults,
+        config.ARTICLES_CACHE_CONTROL,
+    )
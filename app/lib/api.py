@@ -1,8 +1,41 @@
+import time
 import urllib.parse
 import uuid
 from abc import ABC, abstractmethod
 
+import httpx
 import requests
+from fastapi.concurrency import run_in_threadpool
+
+from app import get_config
+
+from .metrics import (
+    upstream_request_duration,
+    upstream_requests_in_progress,
+    upstream_responses,
+)
+from .singleflight import SingleFlight
+from .timing import timed
+from .upstreams import Upstream, get_upstream
+
+in_flight_requests = SingleFlight()
+
+
+class ResourceNotFound(Exception):
+    pass
+
+
+class UpstreamError(ConnectionError):
+    """Raised when an upstream API request fails or its response can't be
+    used."""
+
+
+class UpstreamUnavailable(UpstreamError):
+    """Raised without a request while an upstream's circuit is open."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class BaseAPI(ABC):
@@ -13,9 +46,11 @@ class BaseAPI(ABC):
 
 class GetAPI(BaseAPI):
     api_base_url: str
+    upstream: str = ""
     api_path: str = "/"
     results_per_page: int = 20
     params: dict = {}
+    async_requests: bool = get_config().ASYNC_UPSTREAM_REQUESTS
 
     def __init__(self):
         super().__init__()
@@ -36,13 +71,100 @@ class GetAPI(BaseAPI):
     def build_url(self) -> str:
         return f"{self.api_base_url}{self.api_path}{self.build_query_string()}"
 
+    def parse_response(self, response: requests.Response | httpx.Response):
+        if response.status_code == 404:
+            raise ResourceNotFound("Resource not found")
+        if response.status_code == requests.codes.ok:
+            try:
+                with timed("decode"):
+                    return response.json()
+            except ValueError:
+                raise UpstreamError("API provided non-JSON response")
+        raise UpstreamError("Request to API failed")
+
     def execute(self, url: str) -> dict:
-        r = requests.get(url)
-        if r.status_code == 404:
-            raise Exception("Resource not found")
-        if r.status_code == requests.codes.ok:
+        upstream = get_upstream(self.upstream)
+        if upstream and upstream.session:
+            self.check_circuit(upstream)
+            start = time.perf_counter()
+            upstream_requests_in_progress.inc(upstream.name, self.api_path)
             try:
-                return r.json()
-            except requests.exceptions.JSONDecodeError:
-                raise ConnectionError("API provided non-JSON response")
-        raise ConnectionError("Request to API failed")
+                with timed("upstream"):
+                    r = upstream.get_sync(url)
+            except requests.RequestException:
+                self.record_outcome(upstream, None, start)
+                raise UpstreamError("Request to API failed")
+            finally:
+                upstream_requests_in_progress.dec(upstream.name, self.api_path)
+            self.record_outcome(upstream, r.status_code, start)
+        else:
+            # Outside the app there is no pool, but still use the upstream's
+            # configured timeouts
+            with timed("upstream"):
+                r = requests.get(url, timeout=self.timeout())
+        return self.parse_response(r)
+
+    async def execute_async(self, url: str) -> dict:
+        return await in_flight_requests.do(url, lambda: self.request_async(url))
+
+    async def request_async(self, url: str) -> dict:
+        if not self.async_requests:
+            return await run_in_threadpool(self.execute, url)
+        upstream = get_upstream(self.upstream)
+        if not (upstream and upstream.client):
+            try:
+                connect_timeout, read_timeout = self.timeout()
+                async with httpx.AsyncClient(
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+                ) as client:
+                    with timed("upstream"):
+                        r = await client.get(url)
+            except httpx.HTTPError:
+                raise UpstreamError("Request to API failed")
+            return self.parse_response(r)
+        self.check_circuit(upstream)
+        start = time.perf_counter()
+        upstream_requests_in_progress.inc(upstream.name, self.api_path)
+        try:
+            with timed("upstream"):
+                r = await upstream.get(url)
+        except httpx.HTTPError:
+            self.record_outcome(upstream, None, start)
+            raise UpstreamError("Request to API failed")
+        finally:
+            upstream_requests_in_progress.dec(upstream.name, self.api_path)
+        self.record_outcome(upstream, r.status_code, start)
+        return self.parse_response(r)
+
+    def timeout(self) -> tuple[float, float]:
+        """The upstream's connect and read timeouts, for requests made without
+        its pools."""
+        config = get_config()
+        prefix = self.upstream.upper()
+        return (
+            getattr(config, f"{prefix}_CONNECT_TIMEOUT"),
+            getattr(config, f"{prefix}_READ_TIMEOUT"),
+        )
+
+    def record_outcome(
+        self, upstream: Upstream, status_code: int | None, start: float
+    ) -> None:
+        """Record a request in the upstream's circuit breaker and metrics,
+        with no status code if it failed without a response."""
+        duration = time.perf_counter() - start
+        upstream.breaker.record(
+            status_code is not None and status_code < 500, duration
+        )
+        upstream_request_duration.observe(
+            duration, upstream.name, self.api_path
+        )
+        upstream_responses.inc(
+            upstream.name, self.api_path, str(status_code or "error")
+        )
+
+    def check_circuit(self, upstream: Upstream) -> None:
+        if not upstream.breaker.allow():
+            raise UpstreamUnavailable(
+                f"The {upstream.name} API is unavailable",
+                retry_after=upstream.breaker.retry_after(),
+            )
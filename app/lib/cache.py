@@ -0,0 +1,121 @@
+import threading
+import time
+from collections import OrderedDict
+
+from .timing import timed
+
+caches: dict = {}
+
+
+class TTLCache:
+    """A size-bounded, least-recently-used cache whose entries expire.
+
+    Expired entries are not removed until they are replaced or evicted, so
+    `get` treats them as misses.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale_if_error_hits = 0
+        caches[name] = self
+
+    def get(self, key, default=None):
+        with timed("cache"), self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def get_stale(self, key, default=None):
+        """Return an entry even if it has expired, for when it can't be
+        refreshed."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return default
+            self.stale_if_error_hits += 1
+            return entry[0]
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        if self.maxsize <= 0:
+            return
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "stale_if_error_hits": self.stale_if_error_hits,
+        }
+
+
+class StaleWhileRevalidateCache(TTLCache):
+    """A TTLCache whose entries go stale `stale_after` seconds after being
+    set, but can still be served while they are refreshed until they expire.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, stale_after: float):
+        super().__init__(name, maxsize, ttl)
+        self.stale_after = stale_after
+        self.stale_hits = 0
+        self.refreshing: set = set()
+
+    def lookup(self, key) -> tuple | None:
+        """Return a `(value, is_stale)` tuple, or None on a miss."""
+        entry = super().get(key)
+        if entry is None:
+            return None
+        value, stale_at = entry
+        if stale_at <= time.monotonic():
+            self.stale_hits += 1
+            return value, True
+        return value, False
+
+    def get(self, key, default=None):
+        entry = self.lookup(key)
+        return entry[0] if entry else default
+
+    def get_stale(self, key, default=None):
+        entry = super().get_stale(key)
+        return entry[0] if entry else default
+
+    def set(self, key, value, ttl: float | None = None) -> None:
+        super().set(key, (value, time.monotonic() + self.stale_after), ttl)
+
+    def start_refresh(self, key) -> bool:
+        """Claim the refresh of a stale key, unless one is already running."""
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            return True
+
+    def end_refresh(self, key) -> None:
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def stats(self) -> dict:
+        return super().stats() | {"stale_hits": self.stale_hits}
@@ -0,0 +1,285 @@
+import threading
+import time
+from bisect import bisect_left
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .cache import caches
+from .upstreams import upstreams
+
+# Metrics in the Prometheus text exposition format, cheap enough to collect on
+# every request.
+#
+# Each thread updates its own shard of a metric, so recording never takes a
+# lock; the shards are only added together when the metrics are scraped. A
+# scrape can catch a shard part way through an update, so a histogram's count
+# can briefly be one ahead of its buckets.
+
+metrics: list["Metric"] = []
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+parse_buckets = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+
+
+def escape(value: str) -> str:
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+    )
+
+
+def format_labels(names: tuple, values: tuple, **extra: str) -> str:
+    labels = [
+        f'{name}="{escape(value)}"'
+        for name, value in (*zip(names, values), *extra.items())
+    ]
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+class Metric:
+    type: str
+
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.shards: dict[int, dict] = {}
+        metrics.append(self)
+
+    def shard(self) -> dict:
+        # Shards are only created by their own thread, and adding a key to a
+        # dict is atomic, so this needs no lock either
+        ident = threading.get_ident()
+        if (shard := self.shards.get(ident)) is None:
+            shard = self.shards[ident] = {}
+        return shard
+
+    def collect(self) -> dict:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} {self.type}",
+            *self.samples(),
+        ]
+
+    def samples(self) -> list[str]:
+        return [
+            f"{self.name}{format_labels(self.labels, labels)} {value}"
+            for labels, value in sorted(self.collect().items())
+        ]
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        shard = self.shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> dict:
+        totals = {}
+        for shard in list(self.shards.values()):
+            for labels, value in list(shard.items()):
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Gauge(Counter):
+    """A counter which can go down, for things in progress.
+
+    A thread can decrement a value another incremented, leaving its own
+    shard negative, but the shards still add up to the right value.
+    """
+
+    type = "gauge"
+
+    def dec(self, *labels: str) -> None:
+        self.inc(*labels, amount=-1)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: tuple = (),
+        buckets: tuple = latency_buckets,
+    ):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels: str) -> None:
+        shard = self.shard()
+        if (series := shard.get(labels)) is None:
+            # A count for each bucket and +Inf, then the sum and the count
+            series = shard[labels] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def collect(self) -> dict:
+        totals = {}
+        for shard in list(self.shards.values()):
+            for labels, series in list(shard.items()):
+                total = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(series):
+                    total[i] += value
+        return totals
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, series in sorted(self.collect().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), series):
+                cumulative += count
+                lines.append(
+                    f"{self.name}_bucket"
+                    f"{format_labels(self.labels, labels, le=str(bound))} "
+                    f"{cumulative}"
+                )
+            label_string = format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{label_string} {series[-2]}")
+            lines.append(f"{self.name}_count{label_string} {series[-1]}")
+        return lines
+
+
+class Snapshot(Metric):
+    """A gauge or counter read from elsewhere when the metrics are scraped,
+    so it costs nothing between scrapes."""
+
+    def __init__(self, name: str, help: str, labels: tuple, type: str, read):
+        super().__init__(name, help, labels)
+        self.type = type
+        self.read = read
+
+    def collect(self) -> dict:
+        return self.read()
+
+
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "Time taken to respond to requests, by route",
+    ("method", "route", "status"),
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ("method",),
+)
+upstream_request_duration = Histogram(
+    "upstream_request_duration_seconds",
+    "Time taken by upstream API requests, including retries",
+    ("upstream", "endpoint"),
+)
+upstream_responses = Counter(
+    "upstream_responses_total",
+    "Upstream API responses by status code, or error if there wasn't one",
+    ("upstream", "endpoint", "status"),
+)
+upstream_requests_in_progress = Gauge(
+    "upstream_requests_in_progress",
+    "Upstream API requests waiting for a response",
+    ("upstream", "endpoint"),
+)
+parse_duration = Histogram(
+    "record_parse_duration_seconds",
+    "Time taken to parse and build a record, or a search result, by type",
+    ("type",),
+    buckets=parse_buckets,
+)
+
+
+def cache_stat(stat: str):
+    return lambda: {
+        (name,): stats[stat]
+        for name, cache in caches.items()
+        if stat in (stats := cache.stats())
+    }
+
+
+def cache_hit_ratio() -> dict:
+    ratios = {}
+    for name, cache in caches.items():
+        stats = cache.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratios[(name,)] = stats["hits"] / lookups if lookups else 0
+    return ratios
+
+
+for stat, type, help in (
+    ("hits", "counter", "Cache lookups which found a fresh entry"),
+    ("misses", "counter", "Cache lookups which found no fresh entry"),
+    ("stale_hits", "counter", "Cache lookups served stale while refreshed"),
+    ("stale_if_error_hits", "counter", "Expired entries served on errors"),
+    ("evictions", "counter", "Entries evicted to make room"),
+    ("size", "gauge", "Entries in the cache"),
+):
+    Snapshot(
+        f"cache_{stat}_total" if type == "counter" else f"cache_{stat}",
+        help,
+        ("cache",),
+        type,
+        cache_stat(stat),
+    )
+Snapshot(
+    "cache_hit_ratio",
+    "Proportion of cache lookups which found a fresh entry",
+    ("cache",),
+    "gauge",
+    cache_hit_ratio,
+)
+Snapshot(
+    "circuit_breaker_open",
+    "Whether requests to an upstream are being refused or probed",
+    ("upstream",),
+    "gauge",
+    lambda: {
+        (name,): int(upstream.breaker.state != "closed")
+        for name, upstream in upstreams.items()
+    },
+)
+
+
+def render() -> str:
+    lines = [line for metric in metrics for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_progress.inc(method)
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_progress.dec(method)
+            # Label by the route's template rather than the path, so each ID
+            # doesn't get its own series
+            route = scope.get("route")
+            http_request_duration.observe(
+                time.perf_counter() - start,
+                method,
+                route.path if route else "unmatched",
+                str(status_code),
+            )
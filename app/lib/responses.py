@@ -0,0 +1,227 @@
+import gzip
+import hashlib
+from typing import Any, Collection
+
+import orjson
+from fastapi import Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from starlette.datastructures import Headers
+from starlette.middleware import gzip as gzip_middleware
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app import get_config
+
+from .timing import timed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+config = get_config()
+
+# Content codings we can send, in order of preference
+compressors = {
+    "gzip": lambda body: gzip.compress(
+        body, compresslevel=config.GZIP_COMPRESSION_LEVEL
+    ),
+}
+if brotli:
+    compressors = {
+        "br": lambda body: brotli.compress(body, quality=config.BROTLI_QUALITY),
+    } | compressors
+
+
+def encode_model(value: Any) -> dict:
+    # Our models are plain field containers, so their __dict__ is their JSON
+    if isinstance(value, BaseModel):
+        return value.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content, default=encode_model, option=orjson.OPT_NON_STR_KEYS
+    )
+
+
+def make_etag(*parts: bytes) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        digest.update(part)
+    return f'"{digest.hexdigest()}"'
+
+
+class Payload:
+    """Response content whose JSON and ETag are each computed at most once.
+
+    Payloads are what we cache, so a cached response is only serialised the
+    first time it is sent or revalidated.
+    Payloads built from this one can be kept in `derived`, so they are cached
+    along with it.
+    """
+
+    def __init__(self, content: Any, etag: str | None = None):
+        self.content = content
+        self._body: bytes | None = None
+        self._etag = etag
+        self.encoded_bodies: dict[str, bytes] = {}
+        self.derived: dict[str, "Payload"] = {}
+
+    @property
+    def body(self) -> bytes:
+        if self._body is None:
+            with timed("serialise"):
+                self._body = dumps(self.content)
+        return self._body
+
+    @property
+    def etag(self) -> str:
+        if self._etag is None:
+            self._etag = make_etag(self.body)
+        return self._etag
+
+    def encoded(self, encoding: str) -> bytes:
+        """Return the body compressed with a content coding, compressing it
+        only the first time each coding is asked for."""
+        if encoding not in self.encoded_bodies:
+            body = self.body
+            with timed("compress"):
+                self.encoded_bodies[encoding] = compressors[encoding](body)
+        return self.encoded_bodies[encoding]
+
+    @property
+    def is_stale(self) -> bool:
+        return isinstance(self.content, dict) and bool(
+            self.content.get("stale")
+        )
+
+
+class JSONResponse(ORJSONResponse):
+    """Serialise content with orjson, without validating it first.
+
+    Routes returning this still declare their response_model so the OpenAPI
+    schema is unchanged, but FastAPI does not validate and re-serialise the
+    content against it.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, Payload):
+            return content.body
+        with timed("serialise"):
+            return dumps(content)
+
+
+def negotiate_encoding(
+    accept_encoding: str | None, encodings=compressors
+) -> str | None:
+    """Choose the content coding the client prefers from encodings, using
+    their order between codings it likes equally."""
+    accepted = {}
+    for coding in (accept_encoding or "").split(","):
+        name, *parameters = coding.split(";")
+        quality = 1.0
+        for parameter in parameters:
+            key, _, value = parameter.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip().lower()] = quality
+    quality, _, encoding = max(
+        (accepted.get(encoding, accepted.get("*", 0.0)), -preference, encoding)
+        for preference, encoding in enumerate(encodings)
+    )
+    return encoding if quality > 0 else None
+
+
+class GZipMiddleware(gzip_middleware.GZipMiddleware):
+    """Compress the responses payload_response hasn't already, honouring
+    q-values in Accept-Encoding rather than looking for "gzip" anywhere in
+    it."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        compresslevel: int = 9,
+        exclude_paths: Collection[str] = (),
+    ):
+        super().__init__(app, minimum_size, compresslevel)
+        self.exclude_paths = exclude_paths
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] == "http"
+            and scope["path"] not in self.exclude_paths
+            and negotiate_encoding(
+                Headers(scope=scope).get("accept-encoding"), ["gzip"]
+            )
+        ):
+            responder = gzip_middleware.GZipResponder(
+                self.app, self.minimum_size, compresslevel=self.compresslevel
+            )
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+
+def etag_matches(if_none_match: str | None, etags: set[str]) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") in etags
+        for tag in if_none_match.split(",")
+    )
+
+
+def payload_response(
+    request: Request, payload: Payload, cache_control: str
+) -> Response:
+    # This must be the body GZipMiddleware sees, so it never compresses a
+    # body sent here uncompressed under the uncompressed body's ETag
+    encoding = (
+        negotiate_encoding(request.headers.get("accept-encoding"))
+        if len(payload.body) >= config.COMPRESSION_MIN_SIZE
+        else None
+    )
+    # Each content coding is a different representation, so it gets its own
+    # strong ETag, but any of them shows the client has the current content
+    etag = f'{payload.etag[:-1]}-{encoding}"' if encoding else payload.etag
+    headers = {
+        # A stale fallback shouldn't be reused without checking with us first
+        "Cache-Control": "no-cache" if payload.is_stale else cache_control,
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(
+        request.headers.get("if-none-match"),
+        {payload.etag}
+        | {f'{payload.etag[:-1]}-{coding}"' for coding in compressors},
+    ):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        return Response(
+            payload.encoded(encoding),
+            media_type="application/json",
+            headers=headers | {"Content-Encoding": encoding},
+        )
+    return JSONResponse(payload, headers=headers)
+
+
+def model_response(
+    request: Request,
+    payload: Payload,
+    model: type[BaseModel],
+    cache_control: str,
+) -> Response:
+    # An empty result was previously filled with the model defaults when
+    # FastAPI validated it against the response_model
+    if not payload.content:
+        payload = Payload(model.model_construct().model_dump())
+    return payload_response(request, payload, cache_control)
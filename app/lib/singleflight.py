@@ -0,0 +1,28 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers using the same key.
+
+    Callers wait on a shielded task, so cancelling one caller does not cancel
+    the call for the others.
+    """
+
+    def __init__(self):
+        self.calls: dict[str, asyncio.Task] = {}
+
+    async def do(self, key: str, function: Callable[[], Awaitable]):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(function())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.forget(key, done))
+        return await asyncio.shield(task)
+
+    def forget(self, key: str, task: asyncio.Task) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,12 @@
+import asyncio
+
+background_tasks: set[asyncio.Task] = set()
+
+
+def run_in_background(coroutine) -> asyncio.Task:
+    # The event loop only keeps weak references to tasks, so hold on to them
+    # until they finish
+    task = asyncio.create_task(coroutine)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
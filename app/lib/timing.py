@@ -0,0 +1,135 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("app.requests")
+
+# The time spent in each phase of the current request, in seconds. Phases
+# repeated within a request, such as parsing each search result, are summed.
+# Tasks started by the request share the same dict, so concurrent upstream
+# requests can add up to more than the request took.
+request_timings: ContextVar[dict[str, float] | None] = ContextVar(
+    "request_timings", default=None
+)
+
+# Server-Timing metric names and descriptions, in the order they happen
+phases = {
+    "cache": "Cache lookup",
+    "upstream-connect": "Upstream connect",
+    "upstream": "Upstream request",
+    "decode": "JSON decode",
+    "parse": "Parse",
+    "build": "Model build",
+    "serialise": "Serialise",
+    "compress": "Compress",
+}
+
+
+def record(phase: str, duration: float) -> None:
+    if (timings := request_timings.get()) is not None:
+        timings[phase] = timings.get(phase, 0.0) + duration
+
+
+@contextmanager
+def timed(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start)
+
+
+def connection_tracer():
+    """Return an httpx trace callback which records the time spent opening
+    connections, so it can be told apart from waiting for the response."""
+    started = {}
+
+    async def trace(event: str, info: dict) -> None:
+        step, _, stage = event.rpartition(".")
+        if step not in ("connection.connect_tcp", "connection.start_tls"):
+            return
+        if stage == "started":
+            started[step] = time.perf_counter()
+        elif step in started:
+            record("upstream-connect", time.perf_counter() - started.pop(step))
+
+    return trace
+
+
+def server_timing(timings: dict[str, float], total: float) -> str:
+    metrics = [
+        f'{phase};dur={timings[phase] * 1000:.1f};desc="{description}"'
+        for phase, description in phases.items()
+        if phase in timings
+    ]
+    metrics.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(metrics)
+
+
+class TimingMiddleware:
+    """Time the phases of each request.
+
+    The timings are logged as structured fields once the response has been
+    sent, and sent to the client in a Server-Timing header if enabled.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: dict[str, float] = {}
+        token = request_timings.set(timings)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timings(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = MutableHeaders(scope=message)
+                    headers.append(
+                        "Server-Timing",
+                        server_timing(timings, time.perf_counter() - start),
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            request_timings.reset(token)
+            self.log(scope, status_code, timings, time.perf_counter() - start)
+
+    def log(
+        self, scope: Scope, status_code: int, timings: dict, duration: float
+    ) -> None:
+        if not logger.isEnabledFor(logging.INFO):
+            return
+        timings_ms = {
+            phase: round(timings[phase] * 1000, 1)
+            for phase in phases
+            if phase in timings
+        }
+        logger.info(
+            "%s %s %s %.1fms %s",
+            scope["method"],
+            scope["path"],
+            status_code,
+            duration * 1000,
+            " ".join(f"{phase}={ms}" for phase, ms in timings_ms.items()),
+            extra={
+                "method": scope["method"],
+                "path": scope["path"],
+                "status_code": status_code,
+                "duration_ms": round(duration * 1000, 1),
+                "timings_ms": timings_ms,
+            },
+        )
@@ -0,0 +1,345 @@
+import asyncio
+import math
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util import Retry
+
+from .timing import connection_tracer
+
+# Responses which suggest another attempt, possibly on another node, may work
+retry_statuses = (502, 503, 504)
+
+
+class Budget:
+    """Allow extra requests in proportion to the requests made.
+
+    Each request adds ratio to the budget, and each extra request (a retry or
+    a hedge) spends one. The balance is capped so an idle period can't save
+    up a burst of extra requests.
+    """
+
+    def __init__(self, ratio: float, max_balance: float = 10):
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self.balance = max_balance
+
+    def deposit(self) -> None:
+        self.balance = min(self.balance + self.ratio, self.max_balance)
+
+    def withdraw(self) -> bool:
+        if self.balance < 1:
+            return False
+        self.balance -= 1
+        return True
+
+
+class BudgetedRetry(Retry):
+    """A urllib3 Retry which only retries within a retry budget, so blocking
+    requests spend the same budget as Upstream.get."""
+
+    def __init__(self, *args, budget: Budget | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.budget = budget
+
+    def new(self, **kwargs) -> "BudgetedRetry":
+        retry = super().new(**kwargs)
+        retry.budget = self.budget
+        return retry
+
+    def increment(
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ) -> "BudgetedRetry":
+        retry = super().increment(
+            method, url, response, error, _pool, _stacktrace
+        )
+        if self.budget and not self.budget.withdraw():
+            # Handled as if the retries had run out, so a retryable response
+            # is still returned rather than raised
+            raise MaxRetryError(
+                _pool, url, error or ResponseError("retry budget exhausted")
+            )
+        return retry
+
+
+class LatencyTracker:
+    """The latencies of the most recent successful requests."""
+
+    def __init__(self, size: int = 500, min_samples: int = 50):
+        self.latencies: deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def add(self, latency: float) -> None:
+        self.latencies.append(latency)
+
+    def percentile(self, percentile: float) -> float | None:
+        if len(self.latencies) < self.min_samples:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[
+            min(int(len(latencies) * percentile), len(latencies) - 1)
+        ]
+
+
+class CircuitBreaker:
+    """Stop sending requests to an upstream which is failing or slow.
+
+    The breaker opens when at least `failure_rate` of the last `window`
+    requests failed or took longer than `slow_call_duration`. While open,
+    requests are refused for `open_duration` seconds, after which one probe
+    request is let through (half-open). The breaker closes again if the probe
+    succeeds, or stays open for another `open_duration` if it fails.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float,
+        slow_call_duration: float,
+        min_calls: int,
+        window: int,
+        open_duration: float,
+    ):
+        self.failure_rate = failure_rate
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.failures = 0
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.probe_started_at: float | None = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open":
+                if now < self.opened_at + self.open_duration:
+                    return False
+                self.state = "half_open"
+            # Allow one probe at a time, or another if the last never finished
+            if (
+                self.probe_started_at is not None
+                and now < self.probe_started_at + self.open_duration
+            ):
+                return False
+            self.probe_started_at = now
+            return True
+
+    def record(self, success: bool, duration: float) -> None:
+        failed = not success or duration > self.slow_call_duration
+        with self.lock:
+            if self.state == "half_open":
+                self.open() if failed else self.close()
+            elif self.state == "closed":
+                if len(self.outcomes) == self.outcomes.maxlen:
+                    self.failures -= self.outcomes[0]
+                self.outcomes.append(failed)
+                self.failures += failed
+                if len(
+                    self.outcomes
+                ) >= self.min_calls and self.failures >= self.failure_rate * len(
+                    self.outcomes
+                ):
+                    self.open()
+
+    def open(self) -> None:
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.probe_started_at = None
+
+    def close(self) -> None:
+        self.state = "closed"
+        self.outcomes.clear()
+        self.failures = 0
+        self.probe_started_at = None
+
+    def retry_after(self) -> int:
+        """Seconds until the breaker will next let a request through."""
+        remaining = self.opened_at + self.open_duration - time.monotonic()
+        return max(math.ceil(remaining), 1)
+
+
+class Upstream:
+    """A long-lived connection pool for one upstream API host."""
+
+    def __init__(self, name: str, base_url: str, config):
+        self.name = name
+        self.base_url = base_url
+        prefix = name.upper()
+        self.max_connections = getattr(config, f"{prefix}_MAX_CONNECTIONS")
+        self.max_keepalive_connections = getattr(
+            config, f"{prefix}_MAX_KEEPALIVE_CONNECTIONS"
+        )
+        self.keepalive_expiry = config.UPSTREAM_KEEPALIVE_EXPIRY
+        self.connect_timeout = getattr(config, f"{prefix}_CONNECT_TIMEOUT")
+        self.read_timeout = getattr(config, f"{prefix}_READ_TIMEOUT")
+        self.retries = config.UPSTREAM_RETRIES
+        self.retry_backoff = config.UPSTREAM_RETRY_BACKOFF
+        self.retry_budget = Budget(config.UPSTREAM_RETRY_BUDGET)
+        self.hedge = getattr(config, f"{prefix}_HEDGE_REQUESTS")
+        self.hedge_budget = Budget(config.UPSTREAM_HEDGE_BUDGET)
+        self.latencies = LatencyTracker()
+        self.breaker = CircuitBreaker(
+            failure_rate=config.CIRCUIT_BREAKER_FAILURE_RATE,
+            slow_call_duration=config.CIRCUIT_BREAKER_SLOW_CALL_DURATION,
+            min_calls=config.CIRCUIT_BREAKER_MIN_CALLS,
+            window=config.CIRCUIT_BREAKER_WINDOW,
+            open_duration=config.CIRCUIT_BREAKER_OPEN_DURATION,
+        )
+        self.client: httpx.AsyncClient | None = None
+        self.session: requests.Session | None = None
+
+    def open(self) -> None:
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_keepalive_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                self.read_timeout, connect=self.connect_timeout
+            ),
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_keepalive_connections,
+            max_retries=BudgetedRetry(
+                total=self.retries,
+                backoff_factor=self.retry_backoff,
+                backoff_jitter=self.retry_backoff,
+                status_forcelist=retry_statuses,
+                raise_on_status=False,
+                budget=self.retry_budget,
+            ),
+        )
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    async def close(self) -> None:
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+        if self.session:
+            self.session.close()
+            self.session = None
+
+    def get_sync(self, url: str) -> requests.Response:
+        """GET a URL, retrying failures within the retry budget.
+
+        This runs in the threadpool, where the budget isn't locked, so
+        concurrent requests can occasionally overspend it by a retry.
+        """
+        self.retry_budget.deposit()
+        return self.session.get(
+            url, timeout=(self.connect_timeout, self.read_timeout)
+        )
+
+    async def get(self, url: str) -> httpx.Response:
+        """GET a URL, retrying failures within the retry budget."""
+        self.retry_budget.deposit()
+        self.hedge_budget.deposit()
+        attempt = 0
+        while True:
+            response, error = None, None
+            try:
+                response = await (
+                    self.get_hedged(url) if self.hedge else self.get_once(url)
+                )
+                if response.status_code not in retry_statuses:
+                    return response
+            except httpx.TransportError as e:
+                error = e
+            if attempt == self.retries or not self.retry_budget.withdraw():
+                if error:
+                    raise error
+                return response
+            attempt = attempt + 1
+            # Exponential backoff with full jitter
+            await asyncio.sleep(
+                random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+            )
+
+    async def get_once(self, url: str) -> httpx.Response:
+        start = time.perf_counter()
+        response = await self.client.get(
+            url, extensions={"trace": connection_tracer()}
+        )
+        if response.status_code < 500:
+            self.latencies.add(time.perf_counter() - start)
+        return response
+
+    async def get_hedged(self, url: str) -> httpx.Response:
+        """Send a second request if the first is slower than usual.
+
+        If the first request hasn't answered by the 95th percentile of recent
+        latencies, a duplicate is sent within the hedge budget, and the first
+        successful response is used.
+        """
+        started: dict[asyncio.Future, float] = {}
+        first = asyncio.ensure_future(self.get_once(url))
+        started[first] = time.perf_counter()
+        if (delay := self.latencies.percentile(0.95)) is None:
+            return await first
+        try:
+            done, _ = await asyncio.wait({first}, timeout=delay)
+            if done or not self.hedge_budget.withdraw():
+                return await first
+            hedge = asyncio.ensure_future(self.get_once(url))
+            started[hedge] = time.perf_counter()
+            pending = set(started)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if not task.exception():
+                        # Record how long the loser has taken as a lower bound
+                        # on its latency, or the slowest requests would never
+                        # be recorded and hedges would be sent sooner and sooner
+                        now = time.perf_counter()
+                        for loser in pending:
+                            self.latencies.add(now - started[loser])
+                        return task.result()
+            return first.result()
+        finally:
+            for task in started:
+                task.cancel()
+
+
+upstreams: dict[str, Upstream] = {}
+
+
+def open_upstreams(config) -> None:
+    for name, base_url in (
+        ("rosetta", config.ROSETTA_API_URL),
+        ("wagtail", config.WAGTAIL_API_URL),
+    ):
+        upstream = Upstream(name, base_url, config)
+        upstream.open()
+        upstreams[name] = upstream
+
+
+async def close_upstreams() -> None:
+    while upstreams:
+        _, upstream = upstreams.popitem()
+        await upstream.close()
+
+
+def get_upstream(name: str) -> Upstream | None:
+    return upstreams.get(name)
@@ -1,84 +1,196 @@
+from typing import Literal
+
+from app.lib.api import UpstreamError
+from app.lib.responses import (
+    JSONResponse,
+    Payload,
+    model_response,
+    payload_response,
+)
 from app.records import router
 from app.schemas import Filter
-from app.sources.rosetta import RosettaRecordDetails, RosettaRecordsSearch
-from fastapi import HTTPException
+from app.sources.rosetta import (
+    RosettaRecordDetails,
+    RosettaRecordHierarchy,
+    RosettaRecordsExport,
+    RosettaRecordsSearch,
+)
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from app import get_config
 
 from .schemas import Record, RecordArchive, RecordCreator, RecordSearchResults
 
+config = get_config()
+
 
-@router.get("/")
+@router.get("/", response_model=RecordSearchResults)
 async def index(
+    request: Request,
     q: str = "",
     page: int | None = 1,
+    cursor: str | None = None,
     groups: str | None = None,  # group:(tna,digitised,nonTna,creator,archive)
     highlight: bool | None = False,
-) -> RecordSearchResults:
+) -> Response:
     rosetta_api = RosettaRecordsSearch()
     rosetta_api.add_query(q)
     rosetta_api.add_parameter("filter", f"group:({groups})" if groups else "")
-    results = rosetta_api.get_result(page, highlight)
-    return results
+    if cursor:
+        rosetta_api.add_cursor(cursor)
+    results = await rosetta_api.get_result_async(page, highlight)
+    return model_response(
+        request, results, RecordSearchResults, config.RECORDS_CACHE_CONTROL
+    )
 
 
-@router.get("/internal/")
+@router.get("/internal/", response_model=RecordSearchResults)
 async def internal(
+    request: Request,
     q: str = "",
     page: int | None = 1,
+    cursor: str | None = None,
     highlight: bool | None = False,
-) -> RecordSearchResults:
+) -> Response:
     rosetta_api = RosettaRecordsSearch()
     rosetta_api.add_query(q)
     rosetta_api.add_parameter("filter", "group:(tna)")
-    results = rosetta_api.get_result(page, highlight)
-    return results
+    if cursor:
+        rosetta_api.add_cursor(cursor)
+    results = await rosetta_api.get_result_async(page, highlight)
+    return model_response(
+        request, results, RecordSearchResults, config.RECORDS_CACHE_CONTROL
+    )
 
 
-@router.get("/external/")
+@router.get("/external/", response_model=RecordSearchResults)
 async def external(
+    request: Request,
     q: str = "",
     page: int | None = 1,
+    cursor: str | None = None,
     highlight: bool | None = False,
-) -> RecordSearchResults:
+) -> Response:
     rosetta_api = RosettaRecordsSearch()
     rosetta_api.add_query(q)
     rosetta_api.add_parameter("filter", "group:(nonTna)")
-    results = rosetta_api.get_result(page, highlight)
-    return results
+    if cursor:
+        rosetta_api.add_cursor(cursor)
+    results = await rosetta_api.get_result_async(page, highlight)
+    return model_response(
+        request, results, RecordSearchResults, config.RECORDS_CACHE_CONTROL
+    )
 
 
-@router.get("/creators/")
+@router.get("/creators/", response_model=RecordSearchResults)
 async def creators(
+    request: Request,
     q: str = "",
     page: int | None = 1,
+    cursor: str | None = None,
     highlight: bool | None = False,
-) -> RecordSearchResults:
+) -> Response:
     rosetta_api = RosettaRecordsSearch()
     rosetta_api.add_query(q)
     rosetta_api.add_parameter("filter", "group:(creator)")
-    results = rosetta_api.get_result(page, highlight)
-    return results
+    if cursor:
+        rosetta_api.add_cursor(cursor)
+    results = await rosetta_api.get_result_async(page, highlight)
+    return model_response(
+        request, results, RecordSearchResults, config.RECORDS_CACHE_CONTROL
+    )
 
 
-@router.get("/archives/")
+@router.get("/archives/", response_model=RecordSearchResults)
 async def archives(
+    request: Request,
     q: str = "",
     page: int | None = 1,
+    cursor: str | None = None,
     highlight: bool | None = False,
-) -> RecordSearchResults:
+) -> Response:
     rosetta_api = RosettaRecordsSearch()
     rosetta_api.add_query(q)
     rosetta_api.add_parameter("filter", "group:(archive)")
-    results = rosetta_api.get_result(page, highlight)
-    return results
+    if cursor:
+        rosetta_api.add_cursor(cursor)
+    results = await rosetta_api.get_result_async(page, highlight)
+    return model_response(
+        request, results, RecordSearchResults, config.RECORDS_CACHE_CONTROL
+    )
+
+
+@router.get("/export/")
+async def export(
+    q: str = "",
+    groups: str | None = None,  # group:(tna,digitised,nonTna,creator,archive)
+    format: Literal["ndjson", "csv"] = "ndjson",
+) -> StreamingResponse:
+    rosetta_api = RosettaRecordsExport()
+    rosetta_api.add_query(q)
+    rosetta_api.add_parameter("filter", f"group:({groups})" if groups else "")
+    if format == "csv":
+        content, media_type = rosetta_api.export_csv(), "text/csv"
+    else:
+        content, media_type = (
+            rosetta_api.export_ndjson(),
+            "application/x-ndjson",
+        )
+    return StreamingResponse(
+        content,
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="records.{format}"'
+        },
+    )
+
+
+@router.get("/batch/")
+async def batch(
+    ids: str,  # Comma separated record IDs
+) -> JSONResponse:
+    ids = list(dict.fromkeys(id for id in ids.split(",") if id))
+    if len(ids) > config.RECORD_DETAILS_BATCH_LIMIT:
+        raise HTTPException(
+            status_code=400,
+            detail=f"No more than {config.RECORD_DETAILS_BATCH_LIMIT} IDs can"
+            " be requested at once",
+        )
+    rosetta_api = RosettaRecordDetails()
+    results = await rosetta_api.get_results_async(ids)
+    return JSONResponse(results)
 
 
 @router.get("/{id}/")
 async def item(
+    request: Request,
     id: str,
 ):  # ) -> Record | RecordCreator | RecordArchive:
     rosetta_api = RosettaRecordDetails()
     try:
-        result = rosetta_api.get_result(id)
+        result = await rosetta_api.get_result_async(id)
+    except UpstreamError:
+        raise
+    except Exception:
+        raise HTTPException(status_code=404, detail="Record not found")
+    return payload_response(
+        request, result, config.RECORD_DETAILS_CACHE_CONTROL
+    )
+
+
+@router.get("/{id}/hierarchy/")
+async def hierarchy(
+    request: Request,
+    id: str,
+) -> Response:
+    rosetta_api = RosettaRecordHierarchy()
+    try:
+        result = await rosetta_api.get_result_async(id)
+    except UpstreamError:
+        raise
     except Exception:
         raise HTTPException(status_code=404, detail="Record not found")
-    return result
+    return payload_response(
+        request, Payload(result), config.RECORD_DETAILS_CACHE_CONTROL
+    )
@@ -6,6 +6,7 @@ class Details(BaseModel):
     id: str = ""
     # dump: dict = {}  # TEMP
     source_url: str = ""
+    stale: bool = False
 
     def __init__(self, id: str):
         super().__init__()
@@ -16,6 +16,14 @@ class RecordSearchResult(APISearchResult):
         return self.__dict__
 
 
+cursor_omitted_fields = (
+    "page",
+    "pages",
+    "result_range_min",
+    "result_range_max",
+)
+
+
 class RecordSearchResults(APISearchResponse):
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
@@ -27,3 +35,16 @@ class RecordSearchResults(APISearchResponse):
         "creator": None,
         "archive": None,
     }
+    next_cursor: str | None = None
+    stale: bool = False
+
+    def toJSON(self):
+        if self.page is not None:
+            return super().toJSON()
+        # A page reached with a cursor has no number, so nor does it have a
+        # range or a page count
+        return {
+            key: value
+            for key, value in self.__dict__.items()
+            if key not in cursor_omitted_fields
+        } | {"results": [result.toJSON() for result in self.results]}
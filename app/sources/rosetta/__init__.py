@@ -1 +1,6 @@
-from .api import RosettaRecordDetails, RosettaRecordsSearch
+from .api import (
+    RosettaRecordDetails,
+    RosettaRecordHierarchy,
+    RosettaRecordsExport,
+    RosettaRecordsSearch,
+)
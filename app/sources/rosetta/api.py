@@ -1,4 +1,19 @@
-from app.lib.api import GetAPI
+import asyncio
+import base64
+import csv
+import io
+import logging
+import time
+from typing import AsyncIterator
+
+import orjson
+
+from app.lib.api import GetAPI, ResourceNotFound, UpstreamError
+from app.lib.cache import StaleWhileRevalidateCache, TTLCache
+from app.lib.metrics import parse_duration
+from app.lib.responses import Payload, dumps, encode_model, make_etag
+from app.lib.tasks import run_in_background
+from app.lib.timing import timed
 from app.records.schemas import (
     Record,
     RecordArchive,
@@ -8,16 +23,95 @@ from app.records.schemas import (
     RecordSearchResults,
 )
 from app.schemas import Filter
+from fastapi import HTTPException
 
 from app import get_config
 
 from .lib import RosettaResponseParser, RosettaSourceParser
+from .lib.mapping import outputs, paths
+
+config = get_config()
+logger = logging.getLogger(__name__)
+
+RosettaSourceParser.count_computations = config.PARSER_COUNT_COMPUTATIONS
+
+search_results_cache = StaleWhileRevalidateCache(
+    "search_results",
+    maxsize=config.SEARCH_RESULTS_CACHE_SIZE,
+    ttl=config.SEARCH_RESULTS_CACHE_TTL,
+    stale_after=config.SEARCH_RESULTS_CACHE_STALE_AFTER,
+)
+results_stats_cache = TTLCache(
+    "results_stats",
+    maxsize=config.RESULTS_STATS_CACHE_SIZE,
+    ttl=config.RESULTS_STATS_CACHE_TTL,
+)
+record_details_cache = TTLCache(
+    "record_details",
+    maxsize=config.RECORD_DETAILS_CACHE_SIZE,
+    ttl=config.RECORD_DETAILS_CACHE_TTL,
+)
+record_not_found = object()
+# Each hierarchy node is cached as (level, parent ID), where level is the node
+# as it appears in a record's hierarchy
+hierarchy_cache = TTLCache(
+    "hierarchy_nodes",
+    maxsize=config.HIERARCHY_CACHE_SIZE,
+    ttl=config.HIERARCHY_CACHE_TTL,
+)
+max_hierarchy_depth = 20
+
+
+def cache_hierarchy(parsed_data: RosettaSourceParser) -> None:
+    parent_id = None
+    for level in [*parsed_data.hierarchy(), parsed_data.hierarchy_node()]:
+        if not level["id"]:
+            return
+        hierarchy_cache.set(level["id"], (level, parent_id))
+        parent_id = level["id"]
+
+
+def get_cached_hierarchy(id: str) -> list[dict] | None:
+    """Return the ancestors of a node, or None if any are not cached."""
+    if not (cached := hierarchy_cache.get(id)):
+        return None
+    hierarchy = []
+    _, parent_id = cached
+    while parent_id:
+        if len(hierarchy) == max_hierarchy_depth:
+            return None
+        if not (cached := hierarchy_cache.get(parent_id)):
+            return None
+        level, parent_id = cached
+        hierarchy.insert(0, level)
+    return hierarchy
+
 
-# from pydash import objects
+def encode_cursor(sort_values: list) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(sort_values)).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        sort_values = orjson.loads(base64.urlsafe_b64decode(cursor))
+    except ValueError:
+        sort_values = None
+    if not isinstance(sort_values, list):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return sort_values
+
+
+def get_next_cursor(hits: list[dict], size: int) -> str | None:
+    # A full page may be followed by more results, which start after the
+    # sort values of its last hit
+    if len(hits) == size and (sort_values := hits[-1].get("sort")):
+        return encode_cursor(sort_values)
+    return None
 
 
 class RosettaRecords(GetAPI):
-    api_base_url = get_config().ROSETTA_API_URL
+    api_base_url = config.ROSETTA_API_URL
+    upstream = "rosetta"
 
 
 class RosettaRecordsSearch(RosettaRecords):
@@ -54,84 +148,241 @@ class RosettaRecordsSearch(RosettaRecords):
 
         return filters
 
+    def add_cursor(self, cursor: str) -> None:
+        self.add_parameter(
+            "searchAfter", orjson.dumps(decode_cursor(cursor)).decode()
+        )
+
+    def build_page_url(self, page: int | None = 1) -> str:
+        self.add_parameter("size", self.results_per_page)
+        if "searchAfter" not in self.params:
+            offset = (page - 1) * self.results_per_page
+            self.add_parameter("from", offset)
+        url = self.build_url()
+        logger.debug("Requesting %s", url)
+        return url
+
+    def page_number(self, page: int | None) -> int | None:
+        # Pages reached with a cursor aren't numbered, as their offset isn't
+        # known, so any page given with a cursor is ignored
+        return None if "searchAfter" in self.params else page
+
+    def cache_key(self, highlight: bool | None = False) -> tuple:
+        return (
+            " ".join(str(self.params.get("q", "")).split()),
+            self.params.get("filter", ""),
+            self.params.get("from", 0),
+            self.params.get("searchAfter", ""),
+            self.params.get("size", self.results_per_page),
+            bool(highlight),
+        )
+
     def get_result(
         self, page: int | None = 1, highlight: bool | None = False
+    ) -> Payload:
+        page = self.page_number(page)
+        url = self.build_page_url(page)
+        key = self.cache_key(highlight)
+        if cached := search_results_cache.lookup(key):
+            result, stale = cached
+            if not stale:
+                return result
+        try:
+            raw_results = self.execute(url)
+        except UpstreamError as e:
+            return self.get_stale_result(key, e)
+        result = Payload(self.format_results(raw_results, page, url, highlight))
+        search_results_cache.set(key, result)
+        return result
+
+    async def get_result_async(
+        self, page: int | None = 1, highlight: bool | None = False
+    ) -> Payload:
+        stats_api = RosettaRecordsSearchStats(self.params.get("q", ""))
+        results, results_stats = await asyncio.gather(
+            self.get_page_async(page, highlight),
+            stats_api.get_result_async(),
+        )
+        if not results.content:
+            return results
+        # The ETag comes from the cached page's and the counts, so it is
+        # known without serialising the combined result
+        etag = make_etag(results.etag.encode(), dumps(results_stats))
+        # The combined result is kept with the cached page, so it is only
+        # serialised and compressed again when the counts change
+        combined = results.derived.get("results_stats")
+        if combined is None or combined.etag != etag:
+            combined = results.derived["results_stats"] = Payload(
+                results.content | {"results_stats": results_stats}, etag=etag
+            )
+        return combined
+
+    async def get_page_async(
+        self, page: int | None = 1, highlight: bool | None = False
+    ) -> Payload:
+        page = self.page_number(page)
+        url = self.build_page_url(page)
+        key = self.cache_key(highlight)
+        if cached := search_results_cache.lookup(key):
+            result, stale = cached
+            if stale and search_results_cache.start_refresh(key):
+                run_in_background(self.refresh(key, url, page, highlight))
+            return result
+        try:
+            raw_results = await self.execute_async(url)
+        except UpstreamError as e:
+            return self.get_stale_result(key, e)
+        result = Payload(self.format_results(raw_results, page, url, highlight))
+        search_results_cache.set(key, result)
+        return result
+
+    def get_stale_result(self, key: tuple, error: UpstreamError) -> Payload:
+        """Serve an expired result if the API can't be reached, or raise
+        the error if there isn't one."""
+        if (result := search_results_cache.get_stale(key)) and result.content:
+            return Payload(result.content | {"stale": True})
+        raise error
+
+    async def refresh(
+        self,
+        key: tuple,
+        url: str,
+        page: int | None = 1,
+        highlight: bool | None = False,
+    ) -> None:
+        try:
+            raw_results = await self.execute_async(url)
+            result = Payload(
+                self.format_results(raw_results, page, url, highlight)
+            )
+            search_results_cache.set(key, result)
+        except Exception:
+            # Keep serving the stale result until it expires
+            logger.warning("Failed to refresh search results from %s", url)
+        finally:
+            search_results_cache.end_refresh(key)
+
+    def format_results(
+        self,
+        raw_results: dict,
+        page: int | None,
+        source_url: str,
+        highlight: bool | None = False,
     ) -> dict:
-        offset = (page - 1) * self.results_per_page
-        self.add_parameter("size", self.results_per_page)
-        self.add_parameter("from", offset)
-        url = self.build_url()
-        print(url)
-        raw_results = self.execute(url)
-        results = self.parse_results(raw_results, page, url, highlight)
-        # TODO: Can we get aggregated stats?
-        # stats_api = RosettaRecordsSearchStats(self.params["q"])
-        # results_stats = stats_api.get_result()
-        # results.results_stats = results_stats
+        results = self.parse_results(raw_results, page, source_url, highlight)
         results.filters = self.filters()
-        return results.toJSON() if results.page_in_range() else {}
+        return (
+            results.toJSON() if page is None or results.page_in_range() else {}
+        )
 
     def parse_results(
         self,
         raw_results: dict,
-        page: int,
+        page: int | None,
         source_url: str,
         highlight: bool | None = False,
     ) -> RecordSearchResults:
-        response = RecordSearchResults()
+        response = RecordSearchResults.model_construct()
         response.source_url = source_url
         for r in raw_results["metadata"]:
-            parsed_data = RosettaSourceParser(r)
-            record = RecordSearchResult()
-            type = parsed_data.type()
-            if type == "repository":
-                type = "archive"
-            if type == "agent":
-                type = "creator"
-                if parsed_data.actual_type() == "person":
-                    type = "person"
-            record.type = type
-            record.id = parsed_data.id()
-            record.ref = parsed_data.reference_number()
-            record.title = parsed_data.title(highlight)
-            record.description = parsed_data.description(highlight)
-            record.date_from = parsed_data.date_from()
-            record.date_to = parsed_data.date_to()
-            record.held_by = parsed_data.held_by()
-            response.results.append(record)
-        response.count = (
-            raw_results["stats"]["total"]
-            if raw_results["stats"]["total"] <= 10000
-            else 10000
+            response.results.append(self.parse_result(r, highlight))
+        response.count = min(
+            raw_results["stats"]["total"], config.ELASTICSEARCH_RESULTS_LIMIT
+        )
+        response.next_cursor = get_next_cursor(
+            raw_results["metadata"], self.results_per_page
         )
         response.results_per_page = self.results_per_page
         response.page = page
         return response
 
+    def parse_result(
+        self, rosetta_metadata: dict, highlight: bool | None = False
+    ) -> RecordSearchResult:
+        fields = (
+            outputs.highlighted_search_result
+            if highlight
+            else outputs.search_result
+        )
+        start = time.perf_counter()
+        with timed("parse"):
+            parsed_data = RosettaSourceParser(rosetta_metadata)
+            values = [
+                (field, accessor(parsed_data)) for field, accessor in fields
+            ]
+            if parsed_data.type() in ("record", "aggregation"):
+                cache_hierarchy(parsed_data)
+        with timed("build"):
+            record = RecordSearchResult.model_construct()
+            for field, value in values:
+                setattr(record, field, value)
+        parse_duration.observe(time.perf_counter() - start, "search_result")
+        return record
+
 
-# class RosettaRecordsSearchStats(RosettaRecords):
-#     def __init__(self, query_string):
-#         super().__init__()
-#         self.api_path = "/search"
-#         self.add_parameter("q", query_string)
-
-#     def get_result(self) -> dict:
-#         stats = {
-#             "tna": None,
-#             "digitised": None,
-#             "nonTna": None,
-#             "creator": None,
-#             "archive": None,
-#         }
-#         for group in stats:
-#             self.add_parameter("filter", f"group:({group})")
-#             url = self.build_url()
-#             # print(url)
-#             raw_results = self.execute(url)
-#             # print(url)
-#             results_count = objects.get(raw_results, "stats.total")
-#             stats[group] = results_count
-#         return stats
+class RosettaRecordsSearchStats(RosettaRecords):
+    groups = ("tna", "digitised", "nonTna", "creator", "archive")
+
+    def __init__(self, query_string: str):
+        super().__init__()
+        self.api_path = "/search"
+        self.add_parameter("q", query_string)
+        self.add_parameter("size", 0)
+
+    def get_result(self) -> dict:
+        stats = {}
+        for group in self.groups:
+            stats[group] = self.get_group_count(group)
+        return stats
+
+    async def get_result_async(self) -> dict:
+        counts = await asyncio.gather(
+            *[self.get_group_count_async(group) for group in self.groups]
+        )
+        return dict(zip(self.groups, counts))
+
+    def cache_key(self, group: str) -> tuple:
+        return (" ".join(str(self.params["q"]).split()), group)
+
+    def build_group_url(self, group: str) -> str:
+        self.add_parameter("filter", f"group:({group})")
+        return self.build_url()
+
+    def get_group_count(self, group: str) -> int | None:
+        key = self.cache_key(group)
+        if (results_count := results_stats_cache.get(key)) is not None:
+            return results_count
+        raw_results = self.execute(self.build_group_url(group))
+        results_count = paths.response.total(raw_results)
+        results_stats_cache.set(key, results_count)
+        return results_count
+
+    async def get_group_count_async(self, group: str) -> int | None:
+        key = self.cache_key(group)
+        if (results_count := results_stats_cache.get(key)) is not None:
+            return results_count
+        # Let a slow count finish in the background so it is cached for the
+        # next request, but don't hold up this response waiting for it
+        task = run_in_background(
+            self.fetch_group_count(key, self.build_group_url(group))
+        )
+        try:
+            return await asyncio.wait_for(
+                asyncio.shield(task), timeout=config.RESULTS_STATS_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    async def fetch_group_count(self, key: tuple, url: str) -> int | None:
+        # Failures are handled here, as nothing may be waiting for the task
+        # by the time it fails
+        try:
+            raw_results = await self.execute_async(url)
+        except (UpstreamError, ResourceNotFound):
+            return None
+        results_count = paths.response.total(raw_results)
+        results_stats_cache.set(key, results_count)
+        return results_count
 
 
 class RosettaRecordsSearchAll(RosettaRecords):
@@ -140,110 +391,285 @@ class RosettaRecordsSearchAll(RosettaRecords):
         self.api_path = "/searchAll"
 
 
+class RosettaRecordsExport(RosettaRecordsSearch):
+    """Stream a whole search result set, a batch of results at a time.
+
+    The next batch is requested while the current one is parsed and written,
+    so at most two batches are held in memory.
+    """
+
+    results_per_page = config.RECORDS_EXPORT_BATCH_SIZE
+    csv_columns = [
+        "id",
+        "ref",
+        "type",
+        "title",
+        "description",
+        "date_from",
+        "date_to",
+        "held_by_id",
+        "held_by_name",
+    ]
+
+    async def get_batches(self) -> AsyncIterator[list[RecordSearchResult]]:
+        page = 1
+        cursor = None
+        previous_sort_values = set()
+        limit = None
+        exported = 0
+        next_batch = asyncio.create_task(self.fetch_batch(page))
+        try:
+            while next_batch:
+                raw_results = await next_batch
+                next_batch = None
+                hits = raw_results["metadata"]
+                if limit is None:
+                    # Never export more than the first batch said there were,
+                    # however the API pages
+                    limit = paths.response.total(raw_results)
+                previous_cursor = cursor
+                cursor = get_next_cursor(hits, self.results_per_page)
+                if previous_cursor:
+                    # Skip hits already exported, and stop if the API hasn't
+                    # moved on from the last batch
+                    hits = [
+                        hit
+                        for hit in hits
+                        if orjson.dumps(hit.get("sort"))
+                        not in previous_sort_values
+                    ]
+                    if not hits or cursor == previous_cursor:
+                        logger.warning(
+                            "Export stopped after %s results as the API "
+                            "returned no new results after %s",
+                            exported,
+                            previous_cursor,
+                        )
+                        break
+                hits = hits[: limit - exported]
+                exported += len(hits)
+                page = page + 1
+                if exported < limit and cursor:
+                    next_batch = asyncio.create_task(
+                        self.fetch_batch(page, cursor)
+                    )
+                elif (
+                    exported < limit
+                    and len(hits) == self.results_per_page
+                    and exported < config.ELASTICSEARCH_RESULTS_LIMIT
+                ):
+                    # Without sort values, page within the result window
+                    next_batch = asyncio.create_task(self.fetch_batch(page))
+                if cursor:
+                    previous_sort_values = {
+                        orjson.dumps(hit.get("sort")) for hit in hits
+                    }
+                yield [self.parse_result(r) for r in hits]
+        finally:
+            # Stop fetching if the client goes away
+            if next_batch:
+                next_batch.cancel()
+
+    def build_page_url(self, page: int | None = 1) -> str:
+        if "searchAfter" in self.params:
+            return super().build_page_url(page)
+        # Elasticsearch rejects requests that go beyond its result window
+        offset = (page - 1) * self.results_per_page
+        self.add_parameter(
+            "size",
+            min(
+                self.results_per_page,
+                config.ELASTICSEARCH_RESULTS_LIMIT - offset,
+            ),
+        )
+        self.add_parameter("from", offset)
+        return self.build_url()
+
+    async def fetch_batch(self, page: int, cursor: str | None = None) -> dict:
+        if cursor:
+            self.params.pop("from", None)
+            self.add_cursor(cursor)
+        return await self.execute_async(self.build_page_url(page))
+
+    async def export_ndjson(self) -> AsyncIterator[bytes]:
+        try:
+            async for batch in self.get_batches():
+                yield b"".join(
+                    orjson.dumps(record, default=encode_model) + b"\n"
+                    for record in batch
+                )
+        except UpstreamError as e:
+            # The 200 has already been sent, so end with a record saying the
+            # export is incomplete rather than as if it were complete
+            logger.warning("Export failed: %s", e)
+            error = "The export is incomplete as an upstream request failed"
+            yield orjson.dumps({"error": error}) + b"\n"
+
+    async def export_csv(self) -> AsyncIterator[str]:
+        # CSV can't mark a failure, so errors are raised to abort the
+        # connection before the response is completed
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.csv_columns)
+        writer.writeheader()
+        yield buffer.getvalue()
+        async for batch in self.get_batches():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                {
+                    "id": record.id,
+                    "ref": record.ref,
+                    "type": record.type,
+                    "title": record.title,
+                    "description": record.description,
+                    "date_from": record.date_from,
+                    "date_to": record.date_to,
+                    "held_by_id": (record.held_by or {}).get("id"),
+                    "held_by_name": (record.held_by or {}).get("name"),
+                }
+                for record in batch
+            )
+            yield buffer.getvalue()
+
+
 class RosettaRecordDetails(RosettaRecords):
     def __init__(self):
         super().__init__()
         self.api_path = "/fetch"
 
-    def get_result(self, id: str) -> dict:
+    def build_record_url(self, id: str) -> str:
         self.add_parameter("id", id)
         self.add_parameter("includeSource", True)
         url = self.build_url()
-        print(url)
-        raw_results = self.execute(url)
-        return self.parse_results(raw_results, url)
+        logger.debug("Requesting %s", url)
+        return url
+
+    def get_cached_result(self, id: str) -> Payload | None:
+        result = record_details_cache.get(id)
+        if result is record_not_found:
+            raise ResourceNotFound("Record not found")
+        return result
+
+    def get_result(self, id: str) -> Payload:
+        if result := self.get_cached_result(id):
+            return result
+        url = self.build_record_url(id)
+        try:
+            raw_results = self.execute(url)
+            result = Payload(self.parse_results(raw_results, url))
+        except ResourceNotFound:
+            self.cache_not_found(id)
+            raise
+        except UpstreamError as e:
+            return self.get_stale_result(id, e)
+        record_details_cache.set(id, result)
+        return result
+
+    async def get_result_async(self, id: str) -> Payload:
+        if result := self.get_cached_result(id):
+            return result
+        url = self.build_record_url(id)
+        try:
+            raw_results = await self.execute_async(url)
+            result = Payload(self.parse_results(raw_results, url))
+        except ResourceNotFound:
+            self.cache_not_found(id)
+            raise
+        except UpstreamError as e:
+            return self.get_stale_result(id, e)
+        record_details_cache.set(id, result)
+        return result
+
+    def get_stale_result(self, id: str, error: UpstreamError) -> Payload:
+        """Serve expired details if the API can't be reached, or raise the
+        error if there aren't any."""
+        result = record_details_cache.get_stale(id)
+        if result and result is not record_not_found:
+            return Payload(result.content | {"stale": True})
+        raise error
+
+    async def get_results_async(self, ids: list[str]) -> dict:
+        results = await asyncio.gather(
+            *[RosettaRecordDetails().get_result_async(id) for id in ids],
+            return_exceptions=True,
+        )
+        return {
+            id: self.format_batch_result(id, result)
+            for id, result in zip(ids, results)
+        }
+
+    def format_batch_result(self, id: str, result: Payload | Exception) -> dict:
+        if isinstance(result, ResourceNotFound):
+            return {"error": "Record not found"}
+        if isinstance(result, Exception):
+            logger.warning("Failed to get record %s: %s", id, result)
+            return {"error": "Record could not be retrieved"}
+        return result.content
+
+    def cache_not_found(self, id: str) -> None:
+        record_details_cache.set(
+            id, record_not_found, ttl=config.RECORD_DETAILS_NOT_FOUND_CACHE_TTL
+        )
 
     def parse_results(self, raw_results, source_url):
+        if not raw_results.get("metadata"):
+            raise ResourceNotFound("Record not found")
         try:
-            parsed_data = RosettaResponseParser(raw_results)
+            with timed("parse"):
+                parsed_data = RosettaResponseParser(raw_results)
         except Exception:
             raise Exception("Response is not recognised")
-        if (
-            parsed_data.type() == "record"
-            or parsed_data.type() == "aggregation"
-        ):
-            record = Record(parsed_data.id())
-            record.identifier = parsed_data.identifier()
-            record.former_identifier = parsed_data.former_identifier()
-            record.title = parsed_data.title()
-            record.summary_title = parsed_data.summary_title()
-            record.description = parsed_data.description()
-            record.physical_description = parsed_data.physical_description()
-            record.administrative_background = (
-                parsed_data.administrative_background()
-            )
-            record.arrangement = parsed_data.arrangement()
-            record.date_from = parsed_data.date_from()
-            record.date_to = parsed_data.date_to()
-            record.is_digitised = parsed_data.is_digitised()
-            record.held_by = parsed_data.held_by()
-            record.creators = parsed_data.creators()
-            record.acquisition = parsed_data.acquisition()
-            record.legal_status = parsed_data.legal_status()
-            record.closure_status = parsed_data.closure_status()
-            record.access_condition = parsed_data.access_condition()
-            record.notes = parsed_data.notes()
-            record.unpublished_finding_aids = (
-                parsed_data.unpublished_finding_aids()
-            )
-            record.languages = parsed_data.languages()
-            record.related_materials = parsed_data.related_materials()
-            record.hierarchy = (
-                parsed_data.hierarchies()[0]
-                if len(parsed_data.hierarchies())
-                else []
-            )
-            record.source_url = source_url
-            return record.toJSON()
-        if (
-            parsed_data.type() == "archive"
-            or parsed_data.type() == "repository"
-        ):
-            record = RecordArchive(parsed_data.id())
-            record.name = parsed_data.title()
-            record.archon_code = parsed_data.reference_number()
-            record.repository_url = parsed_data.repository_url()
-            record.opening_times = parsed_data.place_opening_times()
-            record.holidays = parsed_data.place_holidays()
-            record.disabled_access = parsed_data.place_disabled_access()
-            record.information = parsed_data.place_comments()
-            record.fees = parsed_data.place_fee()
-            record.tickets = parsed_data.place_tickets()
-            record.appointments = parsed_data.place_appointment()
-            record.places = parsed_data.places()
-            record.contact_info = parsed_data.contact_info()
-            record.agents = parsed_data.agents()
-            record.manifestations = parsed_data.manifestations()
-            record.accumulation_dates = parsed_data.accumulation_dates()
-            record.source_url = source_url
-            return record.toJSON()
-        if parsed_data.type() == "agent":
-            if parsed_data.actual_type() == "person":
-                record = RecordCreatorPerson(parsed_data.id())
-                record.name = parsed_data.name()
-                record.name_parts = parsed_data.names()
-                record.identifier = parsed_data.identifier()
-                record.former_identifier = parsed_data.former_identifier()
-                record.date = parsed_data.date()
-                record.birth = parsed_data.date_from()
-                record.death = parsed_data.date_to()
-                record.gender = parsed_data.gender()
-                record.functions = parsed_data.functions()
-                record.history = parsed_data.functions()
-                record.biography = parsed_data.biography()
-                record.source_url = source_url
-                return record.toJSON()
-            record = RecordCreator(parsed_data.id())
-            record.name = parsed_data.title()
-            record.identifier = parsed_data.identifier()
-            record.former_identifier = parsed_data.former_identifier()
-            record.date_from = parsed_data.date_from()
-            record.date_to = parsed_data.date_to()
-            record.places = parsed_data.places()
-            record.identifier = parsed_data.identifier()
-            record.history = parsed_data.functions()
+        try:
+            return self.build_record(parsed_data, source_url)
+        finally:
+            if parsed_data.count_computations:
+                logger.debug(
+                    "Parser computations for %s: %s",
+                    source_url,
+                    parsed_data.computation_report(),
+                )
+
+    def build_record(
+        self, parsed_data: RosettaSourceParser, source_url: str
+    ) -> dict:
+        start = time.perf_counter()
+        type = parsed_data.type()
+        if type == "record" or type == "aggregation":
+            model, kind = Record, "record"
+        elif type == "archive" or type == "repository":
+            model, kind = RecordArchive, "archive"
+        elif type == "agent" and parsed_data.actual_type() == "person":
+            model, kind = RecordCreatorPerson, "person"
+        elif type == "agent":
+            model, kind = RecordCreator, "creator"
+        else:
+            raise Exception(f"Respone type '{type}' is not recognised")
+        fields = getattr(outputs, kind)
+        with timed("parse"):
+            if model is Record:
+                cache_hierarchy(parsed_data)
+            id = parsed_data.id()
+            values = [
+                (field, accessor(parsed_data)) for field, accessor in fields
+            ]
+        with timed("build"):
+            record = model.model_construct(id=id)
+            for field, value in values:
+                setattr(record, field, value)
             record.source_url = source_url
-            return record.toJSON()
-        raise Exception(
-            f"Respone type '{parsed_data.type()}' is not recognised"
-        )
+            result = record.toJSON()
+        parse_duration.observe(time.perf_counter() - start, kind)
+        return result
+
+
+class RosettaRecordHierarchy(RosettaRecordDetails):
+    def get_result(self, id: str) -> list[dict]:
+        if (hierarchy := get_cached_hierarchy(id)) is not None:
+            return hierarchy
+        return super().get_result(id).content.get("hierarchy", [])
+
+    async def get_result_async(self, id: str) -> list[dict]:
+        if (hierarchy := get_cached_hierarchy(id)) is not None:
+            return hierarchy
+        record = await super().get_result_async(id)
+        return record.content.get("hierarchy", [])
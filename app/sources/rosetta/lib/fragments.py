@@ -0,0 +1,92 @@
+import lxml.html
+from lxml import etree
+from pyquery.text import extract_text
+
+# Small, predictable HTML/XML fragments from Rosetta documents are parsed the
+# same way PyQuery parses them, but selectors are compiled to XPath once at
+# import rather than translated from CSS on every call. The helpers return the
+# same strings PyQuery did for the same markup.
+
+
+def class_selector(tag: str, class_name: str) -> etree.XPath:
+    return etree.XPath(
+        f"descendant-or-self::{tag}[@class and contains("
+        f"concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+    )
+
+
+def tag_selector(tag: str) -> etree.XPath:
+    return etree.XPath(f"descendant-or-self::{tag.lower()}")
+
+
+child_nodes = etree.XPath("child::text()|child::*")
+
+
+def parse(markup: str) -> list:
+    """Parse markup as XML, falling back to HTML, and return the roots."""
+    if not markup or not markup.strip():
+        return []
+    try:
+        return [etree.fromstring(markup)]
+    except etree.XMLSyntaxError:
+        return [lxml.html.fromstring(markup)]
+
+
+def select(elements: list, selector: etree.XPath) -> list:
+    results = []
+    for element in elements:
+        results.extend(selector(element))
+    return results
+
+
+def find(elements: list, selector: etree.XPath) -> list:
+    """Select from the descendants of elements, but not the elements."""
+    results = []
+    for element in elements:
+        for child in element:
+            results.extend(selector(child))
+    return results
+
+
+def contents(elements: list) -> list:
+    results = []
+    for element in elements:
+        results.extend(child_nodes(element))
+    return results
+
+
+def escape(text: str) -> str:
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+def to_string(nodes: list) -> str:
+    # Text nodes are serialised on their own, so element tails are left out
+    return "".join(
+        (
+            escape(node)
+            if isinstance(node, str)
+            else etree.tostring(node, encoding=str, with_tail=False)
+        )
+        for node in nodes
+    )
+
+
+def inner_html(elements: list) -> str | None:
+    if not elements:
+        return None
+    element = elements[0]
+    html = escape(element.text or "")
+    for child in element:
+        html += etree.tostring(child, encoding=str)
+    return html
+
+
+def text(elements: list) -> str:
+    return " ".join(
+        (
+            inner_html([element])
+            if element.tag == "textarea"
+            else extract_text(element)
+        )
+        for element in elements
+    )
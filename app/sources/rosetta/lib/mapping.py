@@ -0,0 +1,212 @@
+import re
+from operator import methodcaller
+from types import SimpleNamespace
+from typing import Any, Callable
+
+# Declarative mapping from Rosetta documents to our responses, following the
+# Rosetta mapping:
+# https://github.com/nationalarchives/ds-infrastructure-ciim/blob/main/kubernetes/rosetta-staging/config/jpt.json
+#
+# Paths use the same dotted syntax as pydash (e.g. "name[0].first") but are
+# compiled into accessor functions once at import, rather than being parsed on
+# every lookup. A new Rosetta mapping version should only need changes here.
+
+path_spec = {
+    "metadata": {
+        "source": "_source",
+        "highlight": "highLight",
+    },
+    "document": {
+        "type": "@datatype.base",
+        "actual_type": "@datatype.actual",
+        "id": "@admin.id",
+        "uuid": "@admin.uuid",
+        "digitised": "digitised",
+        "summary_title": "summary.title",
+        "birth": "birth.date.value",
+        "death": "death.date.value",
+        "origination_start_date": "origination.date.from",
+        "origination_end_date": "origination.date.to",
+        "physical_description": "measurements.display",
+        "repository_url": "repository.url",
+        "repository_id": "repository.@admin.id",
+        "repository_name": "repository.name.value",
+        "legal_status": "legal.status",
+        "arrangement": "arrangement.value",
+        "closure_status": "availability.closure.label.value",
+        "access_condition": "availability.access.condition.value",
+        "accruals": "accruals.date.value",
+    },
+    "place": {
+        "description": "description.value",
+    },
+    "agent": {
+        "id": "@admin.id",
+        "name": "name.value",
+    },
+    "creator": {
+        "first_names": "name[0].first",
+        "last_name": "name[0].last",
+        "name": "name[0].value",
+        "title": "name[0].title",
+        "date_from": "date.from",
+        "date_to": "date.to",
+    },
+    "acquisition": {
+        "agent_name": "agent.name[0].value",
+        "description": "description.value",
+        "date_from": "agent.date.from",
+        "date_to": "agent.date.to",
+    },
+    "hierarchy_level": {
+        "id": "@admin.id",
+        "title": "summary.title",
+        "level_code": "level.code",
+    },
+    "related": {
+        "id": "@admin.id",
+        "title": "summary.title",
+        "note": "@link.note.value",
+    },
+    "response": {
+        "total": "stats.total",
+    },
+}
+
+# Response fields and the RosettaSourceParser accessors that provide them
+field_spec = {
+    "search_result": {
+        "type": "result_type",
+        "id": "id",
+        "ref": "reference_number",
+        "title": "title",
+        "description": "description",
+        "date_from": "date_from",
+        "date_to": "date_to",
+        "held_by": "held_by",
+    },
+    "record": {
+        "identifier": "identifier",
+        "former_identifier": "former_identifier",
+        "title": "title",
+        "summary_title": "summary_title",
+        "description": "description",
+        "physical_description": "physical_description",
+        "administrative_background": "administrative_background",
+        "arrangement": "arrangement",
+        "date_from": "date_from",
+        "date_to": "date_to",
+        "is_digitised": "is_digitised",
+        "held_by": "held_by",
+        "creators": "creators",
+        "acquisition": "acquisition",
+        "legal_status": "legal_status",
+        "closure_status": "closure_status",
+        "access_condition": "access_condition",
+        "notes": "notes",
+        "unpublished_finding_aids": "unpublished_finding_aids",
+        "languages": "languages",
+        "related_materials": "related_materials",
+        "hierarchy": "hierarchy",
+    },
+    "archive": {
+        "name": "title",
+        "archon_code": "reference_number",
+        "repository_url": "repository_url",
+        "opening_times": "place_opening_times",
+        "holidays": "place_holidays",
+        "disabled_access": "place_disabled_access",
+        "information": "place_comments",
+        "fees": "place_fee",
+        "tickets": "place_tickets",
+        "appointments": "place_appointment",
+        "places": "places",
+        "contact_info": "contact_info",
+        "agents": "agents",
+        "manifestations": "manifestations",
+        "accumulation_dates": "accumulation_dates",
+    },
+    "person": {
+        "name": "name",
+        "name_parts": "names",
+        "identifier": "identifier",
+        "former_identifier": "former_identifier",
+        "date": "date",
+        "birth": "date_from",
+        "death": "date_to",
+        "gender": "gender",
+        "functions": "functions",
+        "history": "functions",
+        "biography": "biography",
+    },
+    "creator": {
+        "name": "title",
+        "identifier": "identifier",
+        "former_identifier": "former_identifier",
+        "date_from": "date_from",
+        "date_to": "date_to",
+        "places": "places",
+        "history": "functions",
+    },
+}
+
+# Fields which can be replaced by search highlights
+highlighted_fields = {"title", "description"}
+
+path_key = re.compile(r"[^.\[\]]+")
+
+
+def compile_path(path: str) -> Callable[[Any], Any]:
+    keys = [
+        int(key) if key.isdigit() else key for key in path_key.findall(path)
+    ]
+
+    def get(data):
+        for key in keys:
+            if isinstance(data, dict):
+                value = data.get(key)
+                if value is None and isinstance(key, int):
+                    value = data.get(str(key))
+                data = value
+            elif isinstance(data, list) and isinstance(key, int):
+                data = data[key] if key < len(data) else None
+            else:
+                return None
+            if data is None:
+                return None
+        return data
+
+    return get
+
+
+def compile_fields(
+    spec: dict, highlight: bool = False
+) -> list[tuple[str, Callable]]:
+    return [
+        (
+            field,
+            (
+                methodcaller(accessor, True)
+                if highlight and field in highlighted_fields
+                else methodcaller(accessor)
+            ),
+        )
+        for field, accessor in spec.items()
+    ]
+
+
+paths = SimpleNamespace(
+    **{
+        group: SimpleNamespace(
+            **{name: compile_path(path) for name, path in group_paths.items()}
+        )
+        for group, group_paths in path_spec.items()
+    }
+)
+
+outputs = SimpleNamespace(
+    **{name: compile_fields(spec) for name, spec in field_spec.items()},
+    highlighted_search_result=compile_fields(
+        field_spec["search_result"], highlight=True
+    ),
+)
@@ -1,5 +1,11 @@
+import functools
+import inspect
+from collections import Counter, defaultdict
+
 from pydash import objects
-from pyquery import PyQuery
+
+from . import fragments
+from .mapping import paths
 
 hierarchy_level_names = {
     1: "Department",
@@ -25,6 +31,117 @@ non_tna_hierarchy_level_names = {
     11: "Sub-item",
 }
 
+place_detail_classes = (
+    "openinghours",
+    "holidays",
+    "disabledaccess",
+    "comments",
+    "fee",
+    "ticket",
+    "appointment",
+)
+
+selectors = {
+    "scopecontent": fragments.class_selector("span", "scopecontent"),
+    "wrapper": fragments.class_selector("span", "wrapper"),
+    "arrangement": fragments.class_selector("span", "arrangement"),
+    "bioghist": fragments.class_selector("span", "bioghist"),
+    "accessionyears": fragments.class_selector("span", "accessionyears"),
+    "accessionyear": fragments.class_selector("span", "accessionyear"),
+} | {
+    tag: fragments.tag_selector(tag)
+    for tag in (
+        "span",
+        "foa",
+        "function",
+        "address",
+        "contact",
+        "addressline1",
+        "addresstown",
+        "postcode",
+        "addresscountry",
+        "mapurl",
+        "url",
+        "telephone",
+        "fax",
+        "email",
+    )
+}
+
+
+class SourceIndex:
+    """The items of one array in a Rosetta document, grouped in a single pass
+    by their type, their label type and whether they are primary. Each group
+    keeps the items in document order.
+    """
+
+    def __init__(self, items: list):
+        self.items = items
+        self.by_type = {}
+        self.by_label_type = {}
+        self.primary = []
+        for item in items:
+            if "type" in item:
+                self.by_type.setdefault(item["type"], []).append(item)
+            if "label" in item and "type" in item["label"]:
+                self.by_label_type.setdefault(item["label"]["type"], []).append(
+                    item
+                )
+            if "primary" in item and item["primary"]:
+                self.primary.append(item)
+
+    def of_type(self, type: str) -> list:
+        return self.by_type.get(type, [])
+
+    def first_of_type(self, type: str) -> dict | None:
+        items = self.by_type.get(type)
+        return items[0] if items else None
+
+    def first_value(self, type: str) -> str | None:
+        return next(
+            (item["value"] for item in self.of_type(type) if "value" in item),
+            None,
+        )
+
+    def first_primary(self) -> dict | None:
+        return self.primary[0] if self.primary else None
+
+
+def memoised(method):
+    """Compute a parser field at most once per document.
+
+    Fields that can be highlighted are cached separately for highlighted and
+    plain values.
+    """
+    name = method.__name__
+
+    def lookup(self, key, *args):
+        if self.computations is not None:
+            self.computations[name]["calls"] += 1
+        try:
+            return self.memo[key]
+        except KeyError:
+            pass
+        if self.computations is not None:
+            self.computations[name]["computed"] += 1
+        result = self.memo[key] = method(self, *args)
+        return result
+
+    if "highlight" in inspect.signature(method).parameters:
+
+        @functools.wraps(method)
+        def wrapper(self, highlight=False):
+            highlight = bool(highlight and self.highlight)
+            return lookup(self, (name, highlight), highlight)
+
+    else:
+
+        @functools.wraps(method)
+        def wrapper(self):
+            return lookup(self, name)
+
+    return wrapper
+
 
 class RosettaResponseParser:
     def __new__(cls, rosetta_data: dict, source_item: int = 0):
@@ -37,68 +154,89 @@ class RosettaResponseParser:
 class RosettaSourceParser:
     # Current mapping: https://github.com/nationalarchives/ds-infrastructure-ciim/blob/main/kubernetes/rosetta-staging/config/jpt.json
 
+    count_computations: bool = False
+
     def __init__(self, rosetta_metadata):
-        self.source = objects.get(rosetta_metadata, "_source")
-        self.highlight = objects.get(rosetta_metadata, "highLight")
+        self.source = paths.metadata.source(rosetta_metadata)
+        self.highlight = paths.metadata.highlight(rosetta_metadata)
+        self.memo = {}
+        self.indexes = {}
+        self.computations = (
+            defaultdict(Counter) if self.count_computations else None
+        )
+
+    def computation_report(self) -> dict:
+        """How often each field was asked for and actually computed, when
+        `count_computations` is enabled."""
+        return {
+            name: dict(counts)
+            for name, counts in (self.computations or {}).items()
+        }
+
+    def index(self, key: str) -> SourceIndex:
+        if key not in self.indexes:
+            self.indexes[key] = SourceIndex(self.source.get(key) or [])
+        return self.indexes[key]
 
     def strip_scope_and_content(self, markup):
-        document = PyQuery(markup.replace("<p/>", ""))
-        return str(document("span.scopecontent").contents())
+        document = fragments.parse(markup.replace("<p/>", ""))
+        scope_content = fragments.select(document, selectors["scopecontent"])
+        return fragments.to_string(fragments.contents(scope_content))
 
     def strip_wrapper_and_split_span(self, markup):
-        document = PyQuery(markup)
-        spans = document("span.wrapper").find("span")
+        document = fragments.parse(markup)
+        wrappers = fragments.select(document, selectors["wrapper"])
+        spans = fragments.find(wrappers, selectors["span"])
         contents = [span.text for span in spans if span.text is not None]
         return "<br>".join(contents)
 
+    def first_tag_text(self, markup, tags) -> str:
+        document = fragments.parse(markup)
+        for tag in tags:
+            if doc_value := fragments.text(
+                fragments.select(document, selectors[tag])
+            ):
+                return doc_value
+        return ""
+
+    @memoised
     def type(self) -> str:
-        return objects.get(self.source, "@datatype.base") or ""
+        return paths.document.type(self.source) or ""
 
+    @memoised
     def actual_type(self) -> str:
-        return objects.get(self.source, "@datatype.actual") or ""
-
+        return paths.document.actual_type(self.source) or ""
+
+    @memoised
+    def result_type(self) -> str:
+        type = self.type()
+        if type == "repository":
+            return "archive"
+        if type == "agent":
+            return "person" if self.actual_type() == "person" else "creator"
+        return type
+
+    @memoised
     def id(self) -> str:
-        return (
-            objects.get(self.source, "@admin.id")
-            or self.iaid
-            or self.faid
-            or ""
-        )
+        return paths.document.id(self.source) or self.iaid or self.faid or ""
 
+    @memoised
     def iaid(self) -> str | None:
-        if "identifier" in self.source:
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item
-                    and item["type"] == "iaid"
-                    and "value" in item
-                ),
-                None,
-            )
-        return None
+        return self.index("identifier").first_value("iaid")
 
+    @memoised
     def faid(self) -> str | None:
-        if "identifier" in self.source:
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item
-                    and item["type"] == "faid"
-                    and "value" in item
-                ),
-                None,
-            )
-        return None
+        return self.index("identifier").first_value("faid")
 
+    @memoised
     def uuid(self) -> str | None:
-        return objects.get(self.source, "@admin.uuid")
+        return paths.document.uuid(self.source)
 
+    @memoised
     def is_digitised(self) -> bool:
-        return objects.get(self.source, "digitised") or False
+        return paths.document.digitised(self.source) or False
 
+    @memoised
     def is_tna(self) -> bool:
         if "@datatype" in self.source and "group" in self.source["@datatype"]:
             groups = [
@@ -109,32 +247,26 @@ class RosettaSourceParser:
             return "tna" in groups or "nonTna" not in groups
         return self.is_digitised() or False
 
+    @memoised
     def title(self, highlight=False) -> str:
         if highlight and self.highlight:
             if "@template.details.summaryTitle" in self.highlight:
                 return self.highlight["@template.details.summaryTitle"][0]
-        if "title" in self.source:
-            if display_title := next(
-                (
-                    item["label"]["value"]
-                    for item in self.source["title"]
-                    if "label" in item
-                    and "value" in item["label"]
-                    and "type" in item["label"]
-                    and item["label"]["type"] == "display"
-                ),
-                None,
-            ):
-                return display_title
-            if title := next(
-                (
-                    item["value"]
-                    for item in self.source["title"]
-                    if "primary" in item and item["primary"] and "value" in item
-                ),
-                None,
-            ):
-                return title
+        titles = self.index("title")
+        if display_title := next(
+            (
+                item["label"]["value"]
+                for item in titles.by_label_type.get("display", [])
+                if "value" in item["label"]
+            ),
+            None,
+        ):
+            return display_title
+        if title := next(
+            (item["value"] for item in titles.primary if "value" in item),
+            None,
+        ):
+            return title
         if name := self.name():
             return name
         if summary_title := self.summary_title():
@@ -143,29 +275,25 @@ class RosettaSourceParser:
             return description
         return ""
 
+    @memoised
     def summary_title(self, highlight=False) -> str | None:
         if highlight and self.highlight:
             if "@template.details.summaryTitle" in self.highlight:
                 return self.highlight["@template.details.summaryTitle"][0]
-        return objects.get(self.source, "summary.title")
+        return paths.document.summary_title(self.source)
 
+    @memoised
     def name(self) -> str | None:
         names = self.names()
         if "name" in names:
             return names["name"]
         return None
 
+    @memoised
     def names(self) -> dict:
         names = {}
         if "name" in self.source:
-            if name_data := next(
-                (
-                    item
-                    for item in self.source["name"]
-                    if "primary" in item and item["primary"]
-                ),
-                None,
-            ):
+            if name_data := self.index("name").first_primary():
                 full_name = []
                 if "title_prefix" in name_data:
                     names["prefix"] = name_data["title_prefix"]
@@ -180,16 +308,13 @@ class RosettaSourceParser:
                     names["title"] = name_data["title"]
                 if full_name:
                     names["name"] = " ".join(full_name)
-            names["alternative_names"] = next(
-                (
-                    item["value"]
-                    for item in self.source["name"]
-                    if "type" in item and item["type"] == "also known as"
-                ),
-                None,
+            alternative_name = self.index("name").first_of_type("also known as")
+            names["alternative_names"] = (
+                alternative_name["value"] if alternative_name else None
             )
         return names
 
+    @memoised
     def date(self) -> str | None:
         date_from = self.date_from()
         date_to = self.date_to()
@@ -197,6 +322,7 @@ class RosettaSourceParser:
             return f"{date_from}–{date_to}"
         return None
 
+    @memoised
     def date_from(self) -> str | None:
         if date_from := self.birth():
             return date_from
@@ -216,6 +342,7 @@ class RosettaSourceParser:
         )
         return date_from
 
+    @memoised
     def date_to(self) -> str | None:
         if date_to := self.death():
             return date_to
@@ -235,18 +362,23 @@ class RosettaSourceParser:
         )
         return date_to
 
+    @memoised
     def birth(self) -> str | None:
-        return objects.get(self.source, "birth.date.value")
+        return paths.document.birth(self.source)
 
+    @memoised
     def death(self) -> str | None:
-        return objects.get(self.source, "death.date.value")
+        return paths.document.death(self.source)
 
+    @memoised
     def origination_start_date(self) -> str | None:
-        return objects.get(self.source, "origination.date.from")
+        return paths.document.origination_start_date(self.source)
 
+    @memoised
     def origination_end_date(self) -> str | None:
-        return objects.get(self.source, "origination.date.to")
+        return paths.document.origination_end_date(self.source)
 
+    @memoised
     def places(self) -> list[str]:
         places = []
         if "place" in self.source:
@@ -292,6 +424,7 @@ class RosettaSourceParser:
                 places.append(place_address)
         return places
 
+    @memoised
     def place_descriptions(self) -> list[str]:
         if "place" in self.source:
             return [
@@ -303,71 +436,54 @@ class RosettaSourceParser:
             ]
         return ""
 
+    @memoised
+    def place_details(self) -> dict:
+        # Parse each place description once and collect every known span,
+        # keeping the first non-empty text found for each class
+        details = {}
+        for place in self.source.get("place", []):
+            if place_details := paths.place.description(place):
+                spans = {}
+                document = fragments.parse(place_details)
+                for span in fragments.select(document, selectors["span"]):
+                    for span_class in (span.get("class") or "").split():
+                        if span_class in place_detail_classes:
+                            spans.setdefault(span_class, []).append(span)
+                for span_class, elements in spans.items():
+                    if span_class not in details:
+                        if text := fragments.text(elements):
+                            details[span_class] = text
+        return details
+
+    @memoised
     def place_opening_times(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if opening_times := document("span.openinghours").text():
-                        return opening_times
-        return None
+        return self.place_details().get("openinghours")
 
+    @memoised
     def place_holidays(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if holidays := document("span.holidays").text():
-                        return holidays
-        return None
+        return self.place_details().get("holidays")
 
+    @memoised
     def place_disabled_access(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if disabled_access := document(
-                        "span.disabledaccess"
-                    ).text():
-                        return disabled_access
-        return None
+        return self.place_details().get("disabledaccess")
 
+    @memoised
     def place_comments(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if comments := document("span.comments").text():
-                        return comments
-        return None
+        return self.place_details().get("comments")
 
+    @memoised
     def place_fee(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if fee := document("span.fee").text():
-                        return fee
-        return None
+        return self.place_details().get("fee")
 
+    @memoised
     def place_tickets(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if tickets := document("span.ticket").text():
-                        return tickets
-        return None
+        return self.place_details().get("ticket")
 
+    @memoised
     def place_appointment(self) -> str | None:
-        if "place" in self.source:
-            for place in self.source["place"]:
-                if place_details := objects.get(place, "description.value"):
-                    document = PyQuery(place_details)
-                    if appointment := document("span.appointment").text():
-                        return appointment
-        return None
+        return self.place_details().get("appointment")
 
+    @memoised
     def gender(self) -> str | None:
         if "gender" in self.source:
             return (
@@ -381,15 +497,14 @@ class RosettaSourceParser:
             )
         return None
 
+    @memoised
     def contact_info(self) -> dict:
         if "description" in self.source:
             if ephemera := next(
                 (
                     item["ephemera"]["value"]
-                    for item in self.source["description"]
+                    for item in self.index("description").primary
                     if "ephemera" in item
-                    and "primary" in item
-                    and item["primary"]
                 ),
                 None,
             ):
@@ -399,9 +514,15 @@ class RosettaSourceParser:
                     .replace("firstName", "first_name")
                     .replace("lastName", "last_name")
                 )
-                document = PyQuery(ephemera)
+                document = fragments.parse(ephemera)
+
+                def document_text(tag):
+                    return fragments.text(
+                        fragments.select(document, selectors[tag])
+                    )
+
                 contacts = []
-                for contact in document("contact"):
+                for contact in fragments.select(document, selectors["contact"]):
                     first_name_el = contact.find("first_name")
                     first_name = (
                         first_name_el.text
@@ -426,37 +547,32 @@ class RosettaSourceParser:
                 return {
                     "address_line_1": [
                         line
-                        for line in document("addressline1")
-                        .text()
-                        .split("<br />")
+                        for line in document_text("addressline1").split(
+                            "<br />"
+                        )
                         if line
                     ]
                     or [],
-                    "town": document("addresstown").text() or None,
-                    "postcode": document("postcode").text() or None,
-                    "country": document("addresscountry").text() or None,
-                    "map_url": document("mapURL").text() or None,
-                    "url": document("url").text() or None,
-                    "phone": document("telephone").text() or None,
-                    "fax": document("fax").text() or None,
-                    "email": document("email").text() or None,
+                    "town": document_text("addresstown") or None,
+                    "postcode": document_text("postcode") or None,
+                    "country": document_text("addresscountry") or None,
+                    "map_url": document_text("mapurl") or None,
+                    "url": document_text("url") or None,
+                    "phone": document_text("telephone") or None,
+                    "fax": document_text("fax") or None,
+                    "email": document_text("email") or None,
                     "contacts": contacts,
                 }
         return {}
 
+    @memoised
     def description(self, highlight=False) -> str | None:
         if highlight and self.highlight:
             if "@template.details.description" in self.highlight:
                 return self.highlight["@template.details.description"][0]
         if "description" in self.source:
-            if description := next(
-                (
-                    item
-                    for item in self.source["description"]
-                    if "primary" in item and item["primary"]
-                ),
-                None,
-            ):
+            descriptions = self.index("description")
+            if description := descriptions.first_primary():
                 if "value" in description:
                     return (
                         self.strip_scope_and_content(description["value"])
@@ -469,22 +585,15 @@ class RosettaSourceParser:
                     "ephemera" in description
                     and "value" in description["ephemera"]
                 ):
-                    document = PyQuery(description["ephemera"]["value"])
-                    for tag in ("foa", "function", "address"):
-                        if doc_value := document(tag).text():
-                            return doc_value
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["description"]
-                    if "value" in item
-                    and "type" in item
-                    and item["type"] == "description"
-                ),
-                None,
-            )
+                    if doc_value := self.first_tag_text(
+                        description["ephemera"]["value"],
+                        ("foa", "function", "address"),
+                    ):
+                        return doc_value
+            return descriptions.first_value("description")
         return None
 
+    @memoised
     def administrative_background(self) -> str | None:
         if (
             "origination" in self.source
@@ -500,76 +609,52 @@ class RosettaSourceParser:
                 ),
                 None,
             ):
-                document = PyQuery(administrative_background)
-                return str(document("span.bioghist").contents())
+                document = fragments.parse(administrative_background)
+                bioghist = fragments.select(document, selectors["bioghist"])
+                return fragments.to_string(fragments.contents(bioghist))
         return None
 
+    @memoised
     def functions(self) -> str | None:
         if "description" in self.source:
-            functions = next(
-                (
-                    item
-                    for item in self.source["description"]
-                    if "type" in item
-                    and item["type"] == "functions, occupations and activities"
-                ),
-                None,
+            functions = self.index("description").first_of_type(
+                "functions, occupations and activities"
             )
             if functions and "value" in functions:
-                document = PyQuery(functions["value"])
-                for tag in ("foa", "function", "address"):
-                    if doc_value := document(tag).text():
-                        return doc_value
-                return functions["value"]
+                return (
+                    self.first_tag_text(
+                        functions["value"], ("foa", "function", "address")
+                    )
+                    or functions["value"]
+                )
         return None
 
+    @memoised
     def physical_description(self) -> str | None:
-        return objects.get(self.source, "measurements.display")
+        return paths.document.physical_description(self.source)
 
+    @memoised
     def epithet(self) -> str | None:
         if "description" in self.source:
-            epithet = next(
-                (
-                    item["value"]
-                    for item in self.source["description"]
-                    if "value" in item
-                    and "type" in item
-                    and item["type"] == "epithet"
-                ),
-                None,
-            )
-            if epithet:
+            if epithet := self.index("description").first_value("epithet"):
                 return epithet
         return None
 
+    @memoised
     def history(self) -> str | None:
         if "description" in self.source:
-            history = next(
-                (
-                    item
-                    for item in self.source["description"]
-                    if "type" in item and item["type"] == "history"
-                ),
-                None,
-            )
+            history = self.index("description").first_of_type("history")
             if history and "value" in history:
-                document = PyQuery(history["value"])
-                for tag in ("foa", "function"):
-                    if doc_value := document(tag).text():
-                        return doc_value
-                return history["value"]
+                return (
+                    self.first_tag_text(history["value"], ("foa", "function"))
+                    or history["value"]
+                )
         return None
 
+    @memoised
     def biography(self) -> str | None:
         if "description" in self.source:
-            biography = next(
-                (
-                    item
-                    for item in self.source["description"]
-                    if "type" in item and item["type"] == "biography"
-                ),
-                None,
-            )
+            biography = self.index("description").first_of_type("biography")
             if biography and "value" in biography and "url" in biography:
                 url = biography["url"]
                 text = biography["value"]
@@ -577,6 +662,7 @@ class RosettaSourceParser:
                 return url
         return None
 
+    @memoised
     def identifier(self) -> str | None:
         if "identifier" in self.source:
             # if identifier := next(
@@ -588,15 +674,8 @@ class RosettaSourceParser:
             #     None,
             # ):
             #     return identifier
-            primary_identifier = next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item
-                    and item["type"] == "name authority reference"
-                    and "value" in item
-                ),
-                None,
+            primary_identifier = self.index("identifier").first_value(
+                "name authority reference"
             )
             return primary_identifier
             # former_identifier = self.former_identifier()
@@ -607,44 +686,26 @@ class RosettaSourceParser:
             # )
         return None
 
+    @memoised
     def former_identifier(self) -> str | None:
         if "identifier" in self.source:
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item
-                    and item["type"] == "former name authority reference"
-                    and "value" in item
-                ),
-                None,
-            ) or next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item
-                    and item["type"] == "former reference (Department)"
-                    and "value" in item
-                ),
-                None,
-            )
+            identifiers = self.index("identifier")
+            return identifiers.first_value(
+                "former name authority reference"
+            ) or identifiers.first_value("former reference (Department)")
         return None
 
+    @memoised
     def reference_number(self) -> str | None:
         if "identifier" in self.source:
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["identifier"]
-                    if "type" in item and item["type"] == "reference number"
-                ),
-                None,
-            )
+            return self.index("identifier").first_value("reference number")
         return None
 
+    @memoised
     def repository_url(self) -> str | None:
-        return objects.get(self.source, "repository.url")
+        return paths.document.repository_url(self.source)
 
+    @memoised
     def agents(self) -> dict:
         agents = {
             "businesses": [],
@@ -663,8 +724,8 @@ class RosettaSourceParser:
                     ),
                     None,
                 ):
-                    id = objects.get(agent, "@admin.id")
-                    name = objects.get(agent, "name.value")
+                    id = paths.agent.id(agent)
+                    name = paths.agent.name(agent)
                     if id and name:
                         places = (
                             [
@@ -688,32 +749,42 @@ class RosettaSourceParser:
                             agents["persons"].append(agent_data)
         return agents
 
+    @memoised
     def held_by(self) -> dict:
         if "repository" in self.source:
-            id = objects.get(self.source, "repository.@admin.id")
-            name = objects.get(self.source, "repository.name.value")
+            id = paths.document.repository_id(self.source)
+            name = paths.document.repository_name(self.source)
             if id and name:
                 return {"id": id, "name": name}
         return {}
 
+    @memoised
     def legal_status(self) -> str | None:
-        return objects.get(self.source, "legal.status")
+        return paths.document.legal_status(self.source)
 
+    @memoised
     def arrangement(self) -> str | None:
-        if arrangement := objects.get(self.source, "arrangement.value"):
-            document = PyQuery(arrangement)
-            if arrangement_contents := document("span.arrangement").contents():
-                return str(arrangement_contents)
-            if arrangement_wrapper := document("span.wrapper").html():
+        if arrangement := paths.document.arrangement(self.source):
+            document = fragments.parse(arrangement)
+            if arrangement_contents := fragments.contents(
+                fragments.select(document, selectors["arrangement"])
+            ):
+                return fragments.to_string(arrangement_contents)
+            if arrangement_wrapper := fragments.inner_html(
+                fragments.select(document, selectors["wrapper"])
+            ):
                 return arrangement_wrapper
         return None
 
+    @memoised
     def closure_status(self) -> str | None:
-        return objects.get(self.source, "availability.closure.label.value")
+        return paths.document.closure_status(self.source)
 
+    @memoised
     def access_condition(self) -> str | None:
-        return objects.get(self.source, "availability.access.condition.value")
+        return paths.document.access_condition(self.source)
 
+    @memoised
     def creators(self) -> list[str]:
         creators = []
         if (
@@ -721,14 +792,14 @@ class RosettaSourceParser:
             and "creator" in self.source["origination"]
         ):
             for creator in self.source["origination"]["creator"]:
-                first_names = objects.get(creator, "name[0].first") or []
-                last_name = objects.get(creator, "name[0].last") or ""
+                first_names = paths.creator.first_names(creator) or []
+                last_name = paths.creator.last_name(creator) or ""
                 name = f"{" ".join(first_names)} {last_name}".strip()
                 if not name:
-                    name = objects.get(creator, "name[0].value")
-                title = objects.get(creator, "name[0].title")
-                date_from = objects.get(creator, "date.from") or ""
-                date_to = objects.get(creator, "date.to") or ""
+                    name = paths.creator.name(creator)
+                title = paths.creator.title(creator)
+                date_from = paths.creator.date_from(creator) or ""
+                date_to = paths.creator.date_to(creator) or ""
                 creators.append(
                     {
                         "name": name,
@@ -742,15 +813,16 @@ class RosettaSourceParser:
                 )
         return creators
 
+    @memoised
     def acquisition(self) -> list[str]:
         acquisition = []
         if "acquisition" in self.source:
             for acquisitor in self.source["acquisition"]:
-                title = objects.get(
-                    acquisitor, "agent.name[0].value"
-                ) or objects.get(acquisitor, "description.value")
-                date_from = objects.get(acquisitor, "agent.date.from") or ""
-                date_to = objects.get(acquisitor, "agent.date.to") or ""
+                title = paths.acquisition.agent_name(
+                    acquisitor
+                ) or paths.acquisition.description(acquisitor)
+                date_from = paths.acquisition.date_from(acquisitor) or ""
+                date_to = paths.acquisition.date_to(acquisitor) or ""
                 acquisition.append(
                     {
                         "title": title,
@@ -763,6 +835,7 @@ class RosettaSourceParser:
                 )
         return acquisition
 
+    @memoised
     def languages(self) -> list[str]:
         if "language" in self.source:
             return [
@@ -772,16 +845,19 @@ class RosettaSourceParser:
             ]
         return []
 
+    @memoised
     def accumulation_dates(self) -> list[str]:
         if "accruals" in self.source:
-            if accruals := objects.get(self.source, "accruals.date.value"):
-                document = PyQuery(accruals)
-                spans = document("span.accessionyears").find(
-                    "span.accessionyear"
+            if accruals := paths.document.accruals(self.source):
+                document = fragments.parse(accruals)
+                spans = fragments.find(
+                    fragments.select(document, selectors["accessionyears"]),
+                    selectors["accessionyear"],
                 )
                 return [span.text for span in spans if span.text is not None]
         return []
 
+    @memoised
     def manifestations(self) -> list[dict]:
         if "manifestations" in self.source:
             return sorted(
@@ -813,53 +889,65 @@ class RosettaSourceParser:
             )
         return []
 
+    @memoised
     def hierarchies(self) -> list[dict]:
         hierarchies = []
         if "@hierarchy" in self.source:
             for hierarchy in self.source["@hierarchy"]:
-                hierarchy_levels = []
-                for level in hierarchy:
-                    id = objects.get(level, "@admin.id")
-                    title = objects.get(level, "summary.title")
-                    level_code = objects.get(level, "level.code")
-                    hierarchy_level = {
-                        "id": id,
-                        "title": title,
-                        "level_code": level_code,
-                    }
-                    if level_code:
-                        level_names = (
-                            hierarchy_level_names
-                            if self.is_tna()
-                            else non_tna_hierarchy_level_names
-                        )
-                        hierarchy_level["level_name"] = (
-                            level_names[level_code]
-                            if level_code in level_names
-                            else ""
-                        )
-                    if "identifier" in level:
-                        if identifier := next(
-                            (
-                                identifier["value"]
-                                for identifier in level["identifier"]
-                                if "value" in identifier
-                                and "primary" in identifier
-                                and identifier["primary"]
-                            ),
-                            None,
-                        ):
-                            hierarchy_level["identifier"] = identifier
-                    hierarchy_levels.append(hierarchy_level)
-                hierarchies.append(hierarchy_levels)
+                hierarchies.append(
+                    [self.hierarchy_level(level) for level in hierarchy]
+                )
         return hierarchies
 
+    def hierarchy_level(self, level: dict) -> dict:
+        id = paths.hierarchy_level.id(level)
+        title = paths.hierarchy_level.title(level)
+        level_code = paths.hierarchy_level.level_code(level)
+        hierarchy_level = {
+            "id": id,
+            "title": title,
+            "level_code": level_code,
+        }
+        if level_code:
+            level_names = (
+                hierarchy_level_names
+                if self.is_tna()
+                else non_tna_hierarchy_level_names
+            )
+            hierarchy_level["level_name"] = (
+                level_names[level_code] if level_code in level_names else ""
+            )
+        if "identifier" in level:
+            if identifier := next(
+                (
+                    identifier["value"]
+                    for identifier in level["identifier"]
+                    if "value" in identifier
+                    and "primary" in identifier
+                    and identifier["primary"]
+                ),
+                None,
+            ):
+                hierarchy_level["identifier"] = identifier
+        return hierarchy_level
+
+    @memoised
+    def hierarchy_node(self) -> dict:
+        """This document as a level in its descendants' hierarchies."""
+        return self.hierarchy_level(self.source)
+
+    @memoised
+    def hierarchy(self) -> list[dict]:
+        hierarchies = self.hierarchies()
+        return hierarchies[0] if len(hierarchies) else []
+
+    @memoised
     def related_materials(self) -> list[dict]:
         related_materials = []
         if "related" in self.source:
             for item in self.source["related"]:
                 if "@entity" in item and item["@entity"] == "literal":
-                    if note := objects.get(item, "@link.note.value"):
+                    if note := paths.related.note(item):
                         related_materials.append(
                             {
                                 "id": None,
@@ -870,9 +958,9 @@ class RosettaSourceParser:
                         )
             for item in self.source["related"]:
                 if "@entity" in item and item["@entity"] == "reference":
-                    id = objects.get(item, "@admin.id")
-                    title = objects.get(item, "summary.title")
-                    note = objects.get(item, "@link.note.value")
+                    id = paths.related.id(item)
+                    title = paths.related.title(item)
+                    note = paths.related.note(item)
                     related_material = {
                         "id": id,
                         "title": title,
@@ -894,20 +982,13 @@ class RosettaSourceParser:
                     related_materials.append(related_material)
         return related_materials
 
+    @memoised
     def unpublished_finding_aids(self) -> str | None:
         if "note" in self.source:
-            return next(
-                (
-                    item["value"]
-                    for item in self.source["note"]
-                    if "value" in item
-                    and "type" in item
-                    and item["type"] == "unpublished finding aids"
-                ),
-                None,
-            )
+            return self.index("note").first_value("unpublished finding aids")
         return None
 
+    @memoised
     def notes(self) -> list[str] | None:
         if "note" in self.source:
             return [
@@ -1,22 +1,36 @@
+import asyncio
+import contextlib
+import logging
 import math
 
 from app.articles.schemas import Article, ArticleSearchResults
 from app.lib.api import GetAPI
+from app.lib.timing import timed
 from app.schemas import Filter
 
 from app import get_config
 
+config = get_config()
+logger = logging.getLogger(__name__)
+
+max_child_page_requests = 4
+
 
 class WagtailAPI(GetAPI):
-    api_base_url = get_config().WAGTAIL_API_URL
+    api_base_url = config.WAGTAIL_API_URL
+    upstream = "wagtail"
 
     def __init__(self):
-        self.api_base_url
+        super().__init__()
 
     def get_result(self) -> dict:
         url = f"{self.api_base_url}/pages/{self.build_query_string()}"
         return self.execute(url)
 
+    async def get_result_async(self) -> dict:
+        url = f"{self.api_base_url}/pages/{self.build_query_string()}"
+        return await self.execute_async(url)
+
 
 class WebsiteArticles(WagtailAPI):
     api_path = "/pages/"
@@ -27,18 +41,19 @@ class WebsiteArticles(WagtailAPI):
     def filters(self) -> list[Filter]:
         filters = []
 
-        # time_period_filter = Filter("Time period", "multiple")
-        # for time_period in get_time_periods():
-        #     time_period_filter.add_filter_option(
-        #         time_period["name"], time_period["value"]
-        #     )
-        # filters.append(time_period_filter)
+        if time_periods := get_time_periods():
+            time_period_filter = Filter("Time period", "multiple")
+            for time_period in time_periods:
+                time_period_filter.add_filter_option(
+                    time_period["name"], time_period["value"]
+                )
+            filters.append(time_period_filter)
 
-        # topics_filter = Filter("Topic", "multiple")
-        # topics = get_topics()
-        # for topic in sorted(topics, key=lambda x: x["name"]):
-        #     topics_filter.add_filter_option(topic["name"], topic["value"])
-        # filters.append(topics_filter)
+        if topics := get_topics():
+            topics_filter = Filter("Topic", "multiple")
+            for topic in sorted(topics, key=lambda x: x["name"]):
+                topics_filter.add_filter_option(topic["name"], topic["value"])
+            filters.append(topics_filter)
 
         types_filter = Filter("Type", "multiple")
         types_filter.add_filter_option(
@@ -58,51 +73,117 @@ class WebsiteArticles(WagtailAPI):
 
         return filters
 
-    def get_result(self, page: int | None = 1) -> dict:
+    def build_page_url(self, page: int | None = 1) -> str:
         offset = (page - 1) * self.results_per_page
         self.add_parameter("offset", offset)
         self.add_parameter("limit", self.results_per_page)
-        url = self.build_url()
+        return self.build_url()
+
+    def get_result(self, page: int | None = 1) -> dict:
+        url = self.build_page_url(page)
         raw_results = self.execute(url)
-        response = ArticleSearchResults()
-        for a in raw_results["items"]:
-            article = Article()
-            article.title = a["title"]
-            article.url = a["full_url"]
-            article.type_label = a["type_label"]
-            article.id = a["id"]
-            article.description = a["teaser_text"]
-            article.image = a["teaser_image"]
-            response.results.append(article)
-        response.count = raw_results["meta"]["total_count"]
-        response.results_per_page = self.results_per_page
-        response.page = page
-        response.source_url = url
-        response.filters = self.filters()
-        return response.toJSON()
-
-
-def get_time_periods():
-    api = WagtailAPI()
-    # api.results_per_page = 100  # TODO: Make higher
-    api.params = {}  # TODO: Why isn't this blank by default?
-    api.add_parameter("child_of", 54)  # TODO: Make variable
-    results = api.get_result()
-    time_periods = [
-        {"name": time_period["title"], "value": time_period["id"]}
-        for time_period in results["items"]
-    ]
-    return time_periods
-
-
-def get_topics():
-    api = WagtailAPI()
-    # api.results_per_page = 100  # TODO: Make higher
-    api.params = {}  # TODO: Why isn't this blank by default?
-    api.add_parameter("child_of", 53)  # TODO: Make variable
-    results = api.get_result()
-    topics = [
-        {"name": topic["title"], "value": topic["id"]}
-        for topic in results["items"]
+        return self.format_results(raw_results, page, url)
+
+    async def get_result_async(self, page: int | None = 1) -> dict:
+        url = self.build_page_url(page)
+        raw_results = await self.execute_async(url)
+        return self.format_results(raw_results, page, url)
+
+    def format_results(self, raw_results: dict, page: int, url: str) -> dict:
+        with timed("build"):
+            response = ArticleSearchResults.model_construct()
+            for a in raw_results["items"]:
+                article = Article.model_construct()
+                article.title = a["title"]
+                article.url = a["full_url"]
+                article.type_label = a["type_label"]
+                article.id = a["id"]
+                article.description = a["teaser_text"]
+                article.image = a["teaser_image"]
+                response.results.append(article)
+            response.count = raw_results["meta"]["total_count"]
+            response.results_per_page = self.results_per_page
+            response.page = page
+            response.source_url = url
+            response.filters = self.filters()
+            return response.toJSON()
+
+
+class ArticleFilterCatalogue:
+    """Topics and time periods from the content API, held in memory.
+
+    The catalogue is loaded when the app starts and refreshed in the
+    background, so article searches never wait on the content API for their
+    filters. If a refresh fails, the previous catalogue is kept.
+    """
+
+    def __init__(self):
+        self.time_periods: list[dict] = []
+        self.topics: list[dict] = []
+        self.task: asyncio.Task | None = None
+
+    async def start(self, refresh_interval: int) -> None:
+        await self.refresh()
+        if refresh_interval > 0:
+            self.task = asyncio.create_task(
+                self.refresh_periodically(refresh_interval)
+            )
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self.task
+            self.task = None
+
+    async def refresh_periodically(self, refresh_interval: int) -> None:
+        while True:
+            await asyncio.sleep(refresh_interval)
+            await self.refresh()
+
+    async def refresh(self) -> None:
+        try:
+            time_periods, topics = await asyncio.gather(
+                get_child_pages(config.WAGTAIL_TIME_PERIODS_PARENT_ID),
+                get_child_pages(config.WAGTAIL_TOPICS_PARENT_ID),
+            )
+        except Exception:
+            logger.warning("Failed to refresh the article filter catalogue")
+            return
+        self.time_periods, self.topics = time_periods, topics
+
+
+async def get_child_pages(parent_id: int) -> list[dict]:
+    # However many pages there are, only send a few requests at a time, so a
+    # large parent doesn't take over the Wagtail connection pool
+    semaphore = asyncio.Semaphore(max_child_page_requests)
+
+    async def fetch_page(page: int):
+        api = WebsiteArticles()
+        api.add_parameter("child_of", parent_id)
+        async with semaphore:
+            return await api.execute_async(api.build_page_url(page))
+
+    first_page = await fetch_page(1)
+    pages = math.ceil(
+        first_page["meta"]["total_count"] / WebsiteArticles.results_per_page
+    )
+    other_pages = await asyncio.gather(
+        *[fetch_page(page) for page in range(2, pages + 1)]
+    )
+    return [
+        {"name": child_page["title"], "value": child_page["id"]}
+        for results in [first_page, *other_pages]
+        for child_page in results["items"]
     ]
-    return topics
+
+
+article_filters = ArticleFilterCatalogue()
+
+
+def get_time_periods() -> list[dict]:
+    return article_filters.time_periods
+
+
+def get_topics() -> list[dict]:
+    return article_filters.topics
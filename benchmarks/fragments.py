@@ -0,0 +1,223 @@
+"""Compare the fragment extraction in RosettaSourceParser against PyQuery.
+
+Run from the repository root with:
+
+    python -m benchmarks.fragments
+
+Each method is run against the same documents by the current parser and by a
+subclass that uses the previous PyQuery implementation, and the outputs are
+checked to be identical before the timings are reported.
+"""
+
+import os
+import timeit
+
+os.environ.setdefault("ROSETTA_API_URL", "http://localhost/api/v1")
+os.environ.setdefault("WAGTAIL_API_URL", "http://localhost/api/v2")
+
+import app.records  # noqa: E402,F401 (imported before app.sources)
+from app.sources.rosetta.lib import RosettaSourceParser  # noqa: E402
+from pyquery import PyQuery  # noqa: E402
+
+
+class PyQueryParser(RosettaSourceParser):
+    def strip_scope_and_content(self, markup):
+        document = PyQuery(markup.replace("<p/>", ""))
+        return str(document("span.scopecontent").contents())
+
+    def strip_wrapper_and_split_span(self, markup):
+        document = PyQuery(markup)
+        spans = document("span.wrapper").find("span")
+        contents = [span.text for span in spans if span.text is not None]
+        return "<br>".join(contents)
+
+    def first_tag_text(self, markup, tags):
+        document = PyQuery(markup)
+        for tag in tags:
+            if doc_value := document(tag).text():
+                return doc_value
+        return ""
+
+    def administrative_background(self):
+        markup = self.source["origination"]["description"][0]["value"]
+        return str(PyQuery(markup)("span.bioghist").contents())
+
+    def arrangement(self):
+        document = PyQuery(self.source["arrangement"]["value"])
+        if arrangement_contents := document("span.arrangement").contents():
+            return str(arrangement_contents)
+        return document("span.wrapper").html()
+
+    def accumulation_dates(self):
+        document = PyQuery(self.source["accruals"]["date"]["value"])
+        spans = document("span.accessionyears").find("span.accessionyear")
+        return [span.text for span in spans if span.text is not None]
+
+    def contact_info(self):
+        ephemera = (
+            self.source["description"][0]["ephemera"]["value"]
+            .replace("mapURL", "mapurl")
+            .replace("jobTitle", "job_title")
+            .replace("firstName", "first_name")
+            .replace("lastName", "last_name")
+        )
+        document = PyQuery(ephemera)
+        contacts = [
+            {
+                "first_name": contact.find("first_name").text,
+                "last_name": contact.find("last_name").text,
+                "job_title": contact.find("job_title").text,
+            }
+            for contact in document("contact")
+        ]
+        return {
+            "address_line_1": [
+                line
+                for line in document("addressline1").text().split("<br />")
+                if line
+            ]
+            or [],
+            "town": document("addresstown").text() or None,
+            "postcode": document("postcode").text() or None,
+            "country": document("addresscountry").text() or None,
+            "map_url": document("mapURL").text() or None,
+            "url": document("url").text() or None,
+            "phone": document("telephone").text() or None,
+            "fax": document("fax").text() or None,
+            "email": document("email").text() or None,
+            "contacts": contacts,
+        }
+
+
+documents = {
+    "description": {
+        "description": [
+            {
+                "primary": True,
+                "value": '<span class="scopecontent"><p>Papers of the '
+                "<b>Board</b> &amp; its committees, including minutes."
+                "</p><p/></span>",
+            }
+        ]
+    },
+    "strip_wrapper_and_split_span": {
+        "description": [
+            {
+                "primary": True,
+                "value": '<span class="wrapper"><span class="line">Minute '
+                'book</span><span class="line">1920-1925</span></span>',
+            }
+        ]
+    },
+    "administrative_background": {
+        "origination": {
+            "description": [
+                {
+                    "type": "administrative background",
+                    "value": '<span class="bioghist"><p>The department was '
+                    "established in 1919.</p><p>It was <i>abolished</i> in "
+                    "1964.</p></span>",
+                }
+            ]
+        }
+    },
+    "arrangement": {
+        "arrangement": {
+            "value": '<span class="wrapper">Arranged <b>chronologically'
+            "</b>.</span>"
+        }
+    },
+    "functions": {
+        "description": [
+            {
+                "type": "functions, occupations and activities",
+                "value": "<functions><foa>Soldier and politician</foa>"
+                "</functions>",
+            }
+        ]
+    },
+    "history": {
+        "description": [
+            {
+                "type": "history",
+                "value": "<history><function>Brewers</function></history>",
+            }
+        ]
+    },
+    "accumulation_dates": {
+        "accruals": {
+            "date": {
+                "value": '<span class="accessionyears">'
+                + "".join(
+                    f'<span class="accessionyear">{year}</span>'
+                    for year in range(1990, 2010)
+                )
+                + "</span>"
+            }
+        }
+    },
+    "contact_info": {
+        "description": [
+            {
+                "primary": True,
+                "ephemera": {
+                    "value": "<contactinfo><addressline1>Bessant Drive"
+                    "</addressline1><addresstown>Richmond</addresstown>"
+                    "<postcode>TW9 4DU</postcode><addresscountry>England"
+                    "</addresscountry><mapURL>https://example.com/map"
+                    "</mapURL><url>https://example.com</url><telephone>020 "
+                    "8876 3444</telephone><fax>020 8392 5286</fax><email>"
+                    "enquiry@example.com</email><contact><firstName>Jo"
+                    "</firstName><lastName>Bloggs</lastName><jobTitle>"
+                    "Archivist</jobTitle></contact></contactinfo>"
+                },
+            }
+        ]
+    },
+}
+
+methods = {
+    "description": "description",
+    "strip_wrapper_and_split_span": "description",
+    "administrative_background": "administrative_background",
+    "arrangement": "arrangement",
+    "functions": "functions",
+    "history": "history",
+    "accumulation_dates": "accumulation_dates",
+    "contact_info": "contact_info",
+}
+
+
+def run(number: int = 2000) -> list[dict]:
+    results = []
+    for name, method in methods.items():
+        rosetta_metadata = {"_source": documents[name]}
+
+        def current():
+            return getattr(RosettaSourceParser(rosetta_metadata), method)()
+
+        def pyquery():
+            return getattr(PyQueryParser(rosetta_metadata), method)()
+
+        if current() != pyquery():
+            raise AssertionError(f"{name}: {current()!r} != {pyquery()!r}")
+        before = min(timeit.repeat(pyquery, number=number, repeat=3)) / number
+        after = min(timeit.repeat(current, number=number, repeat=3)) / number
+        results.append(
+            {
+                "method": name,
+                "pyquery_us": round(before * 1e6, 2),
+                "fragments_us": round(after * 1e6, 2),
+                "speedup": round(before / after, 2),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'method':<30}{'pyquery':>12}{'fragments':>12}{'speedup':>10}")
+    for result in run():
+        print(
+            f"{result['method']:<30}{result['pyquery_us']:>10}us"
+            f"{result['fragments_us']:>10}us{result['speedup']:>9}x"
+        )
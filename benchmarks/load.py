@@ -0,0 +1,317 @@
+"""Load test the whole app against the stand-in upstream APIs.
+
+Run from the repository root with:
+
+    python -m benchmarks.load [--duration S] [--concurrency N] [--rate R] ...
+
+This starts benchmarks.upstream and the app (create_app() under uvicorn) as
+separate processes, then sends a mix of record searches, record details and
+article searches to it and reports the throughput and latency percentiles as
+JSON. Nothing outside this machine is used. To load an app which is already
+running against the stand-in, pass its URL with --url instead.
+
+By default each of --concurrency clients sends its next request as soon as
+the last one is answered. With --rate, requests are sent at a fixed rate
+however long they take, and latencies are measured from when each request
+should have been sent, so a slow app can't hide its queueing delay by
+slowing the load down.
+
+Record IDs are chosen with a Zipf-like popularity, so the caches see some
+records far more often than others, like real traffic.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+
+import httpx
+
+from .upstream import add_profile_arguments, profile_arguments
+
+search_terms = (
+    "admiralty",
+    "navy",
+    "wills",
+    "census",
+    "railway",
+    "ordnance survey",
+    "cabinet papers",
+    "war diaries",
+    "nurses",
+    "domesday",
+    "maps",
+    "medals",
+    "passenger lists",
+    "prisoners",
+    "colonial office",
+)
+
+# Record details IDs, which the stand-in serves as records, aggregations,
+# archives, people and other creators
+record_ids = (
+    [f"C{number}" for number in range(1, 4501)]
+    + [f"A{number}" for number in range(1, 251)]
+    + [f"F{number}" for number in range(1, 251)]
+)
+random.Random(0).shuffle(record_ids)
+record_weights = list(
+    itertools.accumulate(1 / rank for rank in range(1, len(record_ids) + 1))
+)
+
+
+def search_request() -> str:
+    query = {"q": random.choice(search_terms)}
+    if (page := random.choices((1, 2, 3, 4, 5), (70, 15, 8, 4, 3))[0]) > 1:
+        query["page"] = page
+    path = "/api/v1/records/"
+    if random.random() < 0.2:
+        path = random.choice(
+            (
+                "/api/v1/records/internal/",
+                "/api/v1/records/external/",
+                "/api/v1/records/creators/",
+                "/api/v1/records/archives/",
+            )
+        )
+    return f"{path}?{urllib.parse.urlencode(query)}"
+
+
+def details_request() -> str:
+    id = random.choices(record_ids, cum_weights=record_weights)[0]
+    return f"/api/v1/records/{id}/"
+
+
+def articles_request() -> str:
+    query = {"q": random.choice(search_terms)}
+    if (page := random.choices((1, 2, 3), (80, 15, 5))[0]) > 1:
+        query["page"] = page
+    return f"/api/v1/articles/?{urllib.parse.urlencode(query)}"
+
+
+requests = {
+    "search": search_request,
+    "details": details_request,
+    "articles": articles_request,
+}
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in requests:
+            raise argparse.ArgumentTypeError(f"Unknown request type {name}")
+        weights[name] = float(weight)
+    return weights
+
+
+def percentile(latencies: list[float], percentile: float) -> float | None:
+    if not latencies:
+        return None
+    index = max(math.ceil(len(latencies) * percentile) - 1, 0)
+    return round(latencies[index] * 1000, 2)
+
+
+def summarise(results: list[tuple], duration: float) -> dict:
+    latencies = sorted(latency for _, latency, _ in results)
+    statuses = {}
+    for _, _, status in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    return {
+        "requests": len(results),
+        "throughput": round(len(results) / duration, 2),
+        "errors": sum(
+            count
+            for status, count in statuses.items()
+            if status == "error" or status >= 500
+        ),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "p50_ms": percentile(latencies, 0.5),
+        "p95_ms": percentile(latencies, 0.95),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": percentile(latencies, 1),
+    }
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, mix: dict[str, float]):
+        self.client = client
+        self.kinds = list(mix)
+        self.weights = list(mix.values())
+        self.results: list[tuple] = []
+        self.recording = False
+
+    async def send(self, scheduled: float | None = None) -> None:
+        kind = random.choices(self.kinds, self.weights)[0]
+        start = time.perf_counter() if scheduled is None else scheduled
+        try:
+            response = await self.client.get(requests[kind]())
+            await response.aread()
+            status = response.status_code
+        except httpx.HTTPError:
+            status = "error"
+        if self.recording:
+            self.results.append((kind, time.perf_counter() - start, status))
+
+    async def closed_loop(self, concurrency: int, until: float) -> None:
+        async def client():
+            while time.perf_counter() < until:
+                await self.send()
+
+        await asyncio.gather(*[client() for _ in range(concurrency)])
+
+    async def open_loop(self, rate: float, until: float) -> None:
+        tasks = set()
+        start = time.perf_counter()
+        for count in itertools.count():
+            scheduled = start + count / rate
+            if scheduled >= until:
+                break
+            await asyncio.sleep(max(scheduled - time.perf_counter(), 0))
+            task = asyncio.create_task(self.send(scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    async def run(self, args: argparse.Namespace, duration: float) -> None:
+        until = time.perf_counter() + duration
+        if args.rate:
+            await self.open_loop(args.rate, until)
+        else:
+            await self.closed_loop(args.concurrency, until)
+
+
+async def load(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(
+        max_connections=None if args.rate else args.concurrency,
+        max_keepalive_connections=args.concurrency,
+    )
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=30
+    ) as client:
+        generator = LoadGenerator(client, args.mix)
+        await generator.run(args, args.warmup)
+        generator.recording = True
+        start = time.perf_counter()
+        await generator.run(args, args.duration)
+        duration = time.perf_counter() - start
+    results = generator.results
+    return {
+        "duration": round(duration, 2),
+        "concurrency": None if args.rate else args.concurrency,
+        "rate": args.rate,
+        "mix": args.mix,
+        "all": summarise(results, duration),
+        "by_type": {
+            kind: summarise([r for r in results if r[0] == kind], duration)
+            for kind in args.mix
+        },
+    }
+
+
+def wait_until_ready(url: str, process: subprocess.Popen) -> None:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(
+                f"{process.args} exited with {process.returncode}"
+            )
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+def start_servers(args: argparse.Namespace) -> list[subprocess.Popen]:
+    upstream_url = f"http://127.0.0.1:{args.upstream_port}"
+    upstream = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.upstream",
+            f"--port={args.upstream_port}",
+            *profile_arguments(args),
+        ]
+    )
+    wait_until_ready(upstream_url, upstream)
+    app = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app:create_app",
+            "--factory",
+            f"--port={args.app_port}",
+            f"--workers={args.workers}",
+            "--log-level=warning",
+            "--no-access-log",
+        ],
+        env=os.environ
+        | {
+            "ROSETTA_API_URL": f"{upstream_url}/api/v1",
+            "WAGTAIL_API_URL": f"{upstream_url}/api/v2",
+        },
+    )
+    try:
+        wait_until_ready(f"{args.url}/healthcheck/live/", app)
+    except RuntimeError:
+        upstream.terminate()
+        app.terminate()
+        raise
+    return [upstream, app]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument(
+        "--warmup",
+        type=float,
+        default=5,
+        help="seconds of load to send before measuring",
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rate", type=float, help="requests per second")
+    parser.add_argument(
+        "--mix",
+        type=parse_mix,
+        default="search=0.5,details=0.35,articles=0.15",
+        help="the proportion of each request type",
+    )
+    parser.add_argument("--url", help="the URL of an app already running")
+    parser.add_argument("--app-port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--upstream-port", type=int, default=8765)
+    parser.add_argument("--output", help="write the report to this file")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    servers = []
+    if not args.url:
+        args.url = f"http://127.0.0.1:{args.app_port}"
+        servers = start_servers(args)
+    try:
+        report = asyncio.run(load(args))
+    finally:
+        for server in servers:
+            server.terminate()
+            server.wait()
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
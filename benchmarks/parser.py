@@ -0,0 +1,232 @@
+"""Benchmark the Rosetta parser and the search and record details builders.
+
+Run from the repository root with:
+
+    python -m benchmarks.parser [--number N] [--output FILE] [--compare FILE]
+
+Everything runs against the Rosetta /search and /fetch responses in
+benchmarks/fixtures, so no network is needed. The report is JSON, written to
+stdout or FILE, and can be compared with one from another commit using
+--compare, which prints to stderr how much slower or faster each measurement
+is.
+
+For each fixture this measures:
+
+- the cost of each RosettaSourceParser method the responses use, on a fresh
+  parser so nothing is memoised, with the cost of creating the parser taken
+  off
+- the throughput of RosettaRecordsSearch.parse_results, with and without
+  highlights, and of RosettaRecordDetails.parse_results
+- the memory allocated per document, as the peak while parsing and what is
+  still held by the result
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("ROSETTA_API_URL", "http://localhost/api/v1")
+os.environ.setdefault("WAGTAIL_API_URL", "http://localhost/api/v2")
+
+import app.records  # noqa: E402,F401 (imported before app.sources)
+from app.sources.rosetta import (  # noqa: E402
+    RosettaRecordDetails,
+    RosettaRecordsSearch,
+)
+from app.sources.rosetta.lib import RosettaSourceParser  # noqa: E402
+from app.sources.rosetta.lib.mapping import field_spec  # noqa: E402
+
+fixtures_path = Path(__file__).parent / "fixtures"
+
+# The record details fixtures and the fields they are built with
+details_fixtures = {
+    "fetch_record": "record",
+    "fetch_aggregation": "record",
+    "fetch_archive": "archive",
+    "fetch_person": "person",
+    "fetch_creator": "creator",
+}
+
+source_url = "http://localhost/api/v1/fetch"
+
+
+def load_fixture(name: str) -> dict:
+    with open(fixtures_path / f"{name}.json") as f:
+        return json.load(f)
+
+
+def per_call(function, number: int) -> float:
+    """The fastest time for one call to function, in microseconds."""
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1e6
+
+
+def allocations(function) -> dict:
+    function()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = function()  # noqa: F841 (held so its memory is counted)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_bytes": peak - before, "retained_bytes": current - before}
+
+
+def benchmark_methods(number: int) -> list[dict]:
+    results = []
+    search = load_fixture("search")
+    documents = {
+        name: load_fixture(name)["metadata"][0] for name in details_fixtures
+    } | {"search_hit": search["metadata"][1]}
+    specs = details_fixtures | {"search_hit": "search_result"}
+    for fixture, document in documents.items():
+
+        def create():
+            return RosettaSourceParser(document)
+
+        create_us = per_call(create, number)
+        results.append(
+            {
+                "fixture": fixture,
+                "method": "__init__",
+                "us": round(create_us, 3),
+            }
+        )
+        for method in dict.fromkeys(field_spec[specs[fixture]].values()):
+
+            def call():
+                return getattr(RosettaSourceParser(document), method)()
+
+            results.append(
+                {
+                    "fixture": fixture,
+                    "method": method,
+                    "us": round(max(per_call(call, number) - create_us, 0), 3),
+                }
+            )
+    return results
+
+
+def benchmark_search(number: int) -> list[dict]:
+    results = []
+    raw_results = load_fixture("search")
+    documents = len(raw_results["metadata"])
+    for highlight in (False, True):
+
+        def parse():
+            return RosettaRecordsSearch().parse_results(
+                raw_results, 1, source_url, highlight
+            )
+
+        us = per_call(parse, number)
+        results.append(
+            {
+                "fixture": "search",
+                "highlight": highlight,
+                "documents": documents,
+                "us_per_document": round(us / documents, 3),
+                "documents_per_second": round(documents / us * 1e6),
+            }
+            | {
+                key: value // documents
+                for key, value in allocations(parse).items()
+            }
+        )
+    return results
+
+
+def benchmark_details(number: int) -> list[dict]:
+    results = []
+    for fixture in details_fixtures:
+        raw_results = load_fixture(fixture)
+
+        def parse():
+            return RosettaRecordDetails().parse_results(raw_results, source_url)
+
+        us = per_call(parse, number)
+        results.append(
+            {
+                "fixture": fixture,
+                "us_per_document": round(us, 3),
+                "documents_per_second": round(1e6 / us),
+            }
+            | allocations(parse)
+        )
+    return results
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(number: int = 1000) -> dict:
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "number": number,
+        "parser_methods": benchmark_methods(number),
+        "search_parse_results": benchmark_search(max(number // 10, 1)),
+        "details_parse_results": benchmark_details(number),
+    }
+
+
+# The fields identifying each measurement, and the measurement compared
+comparisons = {
+    "parser_methods": (("fixture", "method"), "us"),
+    "search_parse_results": (("fixture", "highlight"), "us_per_document"),
+    "details_parse_results": (("fixture",), "us_per_document"),
+}
+
+
+def compare(before: dict, after: dict) -> None:
+    # Printed to stderr, so the report on stdout is still valid JSON
+    print(f"{before['commit']} -> {after['commit']}", file=sys.stderr)
+    for section, (keys, measure) in comparisons.items():
+        previous = {
+            tuple(result[key] for key in keys): result[measure]
+            for result in before.get(section, [])
+        }
+        for result in after[section]:
+            name = tuple(result[key] for key in keys)
+            if not previous.get(name):
+                continue
+            change = result[measure] / previous[name]
+            label = " ".join(str(part) for part in (section, *name))
+            print(
+                f"{label:<60}{previous[name]:>10}us{result[measure]:>10}us"
+                f"{change:>9.2f}x",
+                file=sys.stderr,
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=1000)
+    parser.add_argument("--output", help="write the report to this file")
+    parser.add_argument("--compare", help="a previous report to compare with")
+    args = parser.parse_args()
+    report = run(args.number)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
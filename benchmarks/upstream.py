@@ -0,0 +1,199 @@
+"""A stand-in for the Rosetta and Wagtail APIs, for load testing.
+
+Run from the repository root with:
+
+    python -m benchmarks.upstream [--port PORT] [--search-latency MS] ...
+
+Rosetta is served at /api/v1 and Wagtail at /api/v2, so point the app at it
+with ROSETTA_API_URL=http://127.0.0.1:PORT/api/v1 and
+WAGTAIL_API_URL=http://127.0.0.1:PORT/api/v2.
+
+Responses come from the fixtures in benchmarks/fixtures. Each of /search,
+/fetch and /pages/ waits for a latency drawn from a log-normal distribution
+with the given median and spread, and fails with a 503 at the given rate.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+from dataclasses import dataclass
+from pathlib import Path
+
+import orjson
+from fastapi import FastAPI, Response
+
+fixtures_path = Path(__file__).parent / "fixtures"
+
+endpoints = ("search", "fetch", "pages")
+
+
+@dataclass
+class Profile:
+    """How an endpoint behaves: the median latency and spread (the sigma of
+    the underlying normal distribution) in seconds, and the error rate."""
+
+    median: float = 0.05
+    sigma: float = 0.5
+    error_rate: float = 0.0
+
+    async def wait(self) -> bool:
+        """Wait for a latency from the distribution, then return whether the
+        request should fail."""
+        await asyncio.sleep(
+            random.lognormvariate(math.log(self.median), self.sigma)
+            if self.median > 0
+            else 0
+        )
+        return random.random() < self.error_rate
+
+
+def load_fixture(name: str) -> dict:
+    with open(fixtures_path / f"{name}.json") as f:
+        return json.load(f)
+
+
+def fetch_fixture(id: str) -> str | None:
+    """Choose the fixture for a record ID, so a range of IDs gets a mix of
+    records, aggregations, archives, people and other creators."""
+    prefix, number = id[:1], id[1:]
+    if not number.isdigit():
+        return None
+    if prefix == "C":
+        return "fetch_aggregation" if number.endswith("0") else "fetch_record"
+    if prefix == "A":
+        return "fetch_archive"
+    if prefix == "F":
+        return "fetch_person" if int(number) % 2 else "fetch_creator"
+    return None
+
+
+def json_response(content, status_code: int = 200) -> Response:
+    return Response(
+        content if isinstance(content, bytes) else orjson.dumps(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+def create_upstream(profiles: dict[str, Profile]) -> FastAPI:
+    app = FastAPI(openapi_url=None)
+    search = load_fixture("search")
+    documents = {
+        name: load_fixture(name)["metadata"][0]
+        for name in (
+            "fetch_record",
+            "fetch_aggregation",
+            "fetch_archive",
+            "fetch_person",
+            "fetch_creator",
+        )
+    }
+    pages = load_fixture("pages")
+    # Search pages only depend on the page size, so each is serialised once
+    search_pages: dict[int, bytes] = {}
+    unavailable = {"error": "Service unavailable"}
+
+    @app.get("/api/v1/search")
+    async def search_records(size: int = 20):
+        if await profiles["search"].wait():
+            return json_response(unavailable, 503)
+        if size not in search_pages:
+            hits = search["metadata"]
+            search_pages[size] = orjson.dumps(
+                search
+                | {"metadata": [hits[i % len(hits)] for i in range(size)]}
+            )
+        return json_response(search_pages[size])
+
+    @app.get("/api/v1/fetch")
+    async def fetch_record(id: str):
+        if await profiles["fetch"].wait():
+            return json_response(unavailable, 503)
+        if (fixture := fetch_fixture(id)) is None:
+            return json_response({"metadata": []}, 404)
+        document = documents[fixture]
+        source = document["_source"]
+        # Give each ID its own document, without copying the whole fixture
+        return json_response(
+            {
+                "metadata": [
+                    document
+                    | {
+                        "_source": source
+                        | {"@admin": source["@admin"] | {"id": id}}
+                    }
+                ]
+            }
+        )
+
+    @app.get("/api/v2/pages/")
+    async def list_pages(limit: int = 20):
+        if await profiles["pages"].wait():
+            return json_response(unavailable, 503)
+        items = pages["items"]
+        return json_response(
+            pages | {"items": [items[i % len(items)] for i in range(limit)]}
+        )
+
+    return app
+
+
+def add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    for endpoint in endpoints:
+        parser.add_argument(
+            f"--{endpoint}-latency",
+            type=float,
+            default=50,
+            help=f"median /{endpoint} latency in milliseconds",
+        )
+        parser.add_argument(
+            f"--{endpoint}-sigma",
+            type=float,
+            default=0.5,
+            help=f"spread of /{endpoint} latencies",
+        )
+        parser.add_argument(
+            f"--{endpoint}-errors",
+            type=float,
+            default=0.0,
+            help=f"proportion of /{endpoint} requests which fail",
+        )
+
+
+def profile_arguments(args: argparse.Namespace) -> list[str]:
+    """The command line arguments to start a server with the same profiles."""
+    return [
+        f"--{endpoint}-{setting}={getattr(args, f'{endpoint}_{setting}')}"
+        for endpoint in endpoints
+        for setting in ("latency", "sigma", "errors")
+    ]
+
+
+def profiles_from_arguments(args: argparse.Namespace) -> dict[str, Profile]:
+    return {
+        endpoint: Profile(
+            median=getattr(args, f"{endpoint}_latency") / 1000,
+            sigma=getattr(args, f"{endpoint}_sigma"),
+            error_rate=getattr(args, f"{endpoint}_errors"),
+        )
+        for endpoint in endpoints
+    }
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_upstream(profiles_from_arguments(args)),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+        access_log=False,
+    )
@@ -15,6 +15,116 @@ class Base(object):
     ROSETTA_API_URL = os.environ.get("ROSETTA_API_URL").rstrip("/")
     WAGTAIL_API_URL = os.environ.get("WAGTAIL_API_URL").rstrip("/")
 
+    ASYNC_UPSTREAM_REQUESTS = strtobool(
+        os.getenv("ASYNC_UPSTREAM_REQUESTS", "True")
+    )
+
+    UPSTREAM_KEEPALIVE_EXPIRY = float(
+        os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")
+    )
+    ROSETTA_MAX_CONNECTIONS = int(os.getenv("ROSETTA_MAX_CONNECTIONS", "100"))
+    ROSETTA_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("ROSETTA_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    ROSETTA_CONNECT_TIMEOUT = float(os.getenv("ROSETTA_CONNECT_TIMEOUT", "2"))
+    ROSETTA_READ_TIMEOUT = float(os.getenv("ROSETTA_READ_TIMEOUT", "10"))
+    ROSETTA_HEDGE_REQUESTS = strtobool(
+        os.getenv("ROSETTA_HEDGE_REQUESTS", "True")
+    )
+    WAGTAIL_MAX_CONNECTIONS = int(os.getenv("WAGTAIL_MAX_CONNECTIONS", "20"))
+    WAGTAIL_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("WAGTAIL_MAX_KEEPALIVE_CONNECTIONS", "10")
+    )
+    WAGTAIL_CONNECT_TIMEOUT = float(os.getenv("WAGTAIL_CONNECT_TIMEOUT", "2"))
+    WAGTAIL_READ_TIMEOUT = float(os.getenv("WAGTAIL_READ_TIMEOUT", "10"))
+    WAGTAIL_HEDGE_REQUESTS = strtobool(
+        os.getenv("WAGTAIL_HEDGE_REQUESTS", "False")
+    )
+    UPSTREAM_RETRIES = int(os.getenv("UPSTREAM_RETRIES", "2"))
+    UPSTREAM_RETRY_BACKOFF = float(os.getenv("UPSTREAM_RETRY_BACKOFF", "0.1"))
+    UPSTREAM_RETRY_BUDGET = float(os.getenv("UPSTREAM_RETRY_BUDGET", "0.1"))
+    UPSTREAM_HEDGE_BUDGET = float(os.getenv("UPSTREAM_HEDGE_BUDGET", "0.05"))
+
+    CIRCUIT_BREAKER_FAILURE_RATE = float(
+        os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")
+    )
+    CIRCUIT_BREAKER_SLOW_CALL_DURATION = float(
+        os.getenv("CIRCUIT_BREAKER_SLOW_CALL_DURATION", "5")
+    )
+    CIRCUIT_BREAKER_MIN_CALLS = int(
+        os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "20")
+    )
+    CIRCUIT_BREAKER_WINDOW = int(os.getenv("CIRCUIT_BREAKER_WINDOW", "100"))
+    CIRCUIT_BREAKER_OPEN_DURATION = float(
+        os.getenv("CIRCUIT_BREAKER_OPEN_DURATION", "10")
+    )
+
+    RECORD_DETAILS_CACHE_SIZE = int(
+        os.getenv("RECORD_DETAILS_CACHE_SIZE", "5000")
+    )
+    RECORD_DETAILS_CACHE_TTL = int(
+        os.getenv("RECORD_DETAILS_CACHE_TTL", "3600")
+    )
+    RECORD_DETAILS_NOT_FOUND_CACHE_TTL = int(
+        os.getenv("RECORD_DETAILS_NOT_FOUND_CACHE_TTL", "300")
+    )
+
+    RECORD_DETAILS_BATCH_LIMIT = int(
+        os.getenv("RECORD_DETAILS_BATCH_LIMIT", "50")
+    )
+
+    HIERARCHY_CACHE_SIZE = int(os.getenv("HIERARCHY_CACHE_SIZE", "50000"))
+    HIERARCHY_CACHE_TTL = int(os.getenv("HIERARCHY_CACHE_TTL", "86400"))
+
+    SEARCH_RESULTS_CACHE_SIZE = int(
+        os.getenv("SEARCH_RESULTS_CACHE_SIZE", "2000")
+    )
+    SEARCH_RESULTS_CACHE_STALE_AFTER = int(
+        os.getenv("SEARCH_RESULTS_CACHE_STALE_AFTER", "60")
+    )
+    SEARCH_RESULTS_CACHE_TTL = int(os.getenv("SEARCH_RESULTS_CACHE_TTL", "900"))
+
+    RECORDS_EXPORT_BATCH_SIZE = int(
+        os.getenv("RECORDS_EXPORT_BATCH_SIZE", "500")
+    )
+
+    RESULTS_STATS_TIMEOUT = float(os.getenv("RESULTS_STATS_TIMEOUT", "0.5"))
+    RESULTS_STATS_CACHE_SIZE = int(
+        os.getenv("RESULTS_STATS_CACHE_SIZE", "2000")
+    )
+    RESULTS_STATS_CACHE_TTL = int(os.getenv("RESULTS_STATS_CACHE_TTL", "120"))
+
+    WAGTAIL_TIME_PERIODS_PARENT_ID = int(
+        os.getenv("WAGTAIL_TIME_PERIODS_PARENT_ID", "54")
+    )
+    WAGTAIL_TOPICS_PARENT_ID = int(os.getenv("WAGTAIL_TOPICS_PARENT_ID", "53"))
+    ARTICLE_FILTERS_REFRESH_INTERVAL = int(
+        os.getenv("ARTICLE_FILTERS_REFRESH_INTERVAL", "3600")
+    )
+
+    PARSER_COUNT_COMPUTATIONS = strtobool(
+        os.getenv("PARSER_COUNT_COMPUTATIONS", "False")
+    )
+
+    RECORDS_CACHE_CONTROL = os.getenv(
+        "RECORDS_CACHE_CONTROL",
+        "public, max-age=60, stale-while-revalidate=600",
+    )
+    RECORD_DETAILS_CACHE_CONTROL = os.getenv(
+        "RECORD_DETAILS_CACHE_CONTROL",
+        "public, max-age=3600, stale-while-revalidate=86400",
+    )
+    ARTICLES_CACHE_CONTROL = os.getenv(
+        "ARTICLES_CACHE_CONTROL",
+        "public, max-age=300, stale-while-revalidate=3600",
+    )
+
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
+    BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+
+    SERVER_TIMING = strtobool(os.getenv("SERVER_TIMING", "False"))
+
     ELASTICSEARCH_RESULTS_LIMIT = int(
         os.environ.get("ELASTICSEARCH_RESULTS_LIMIT", "10000")
     )
@@ -30,6 +140,7 @@ class Staging(Base):
 
 class Develop(Base):
     DEBUG = strtobool(os.getenv("DEBUG", "True"))
+    SERVER_TIMING = strtobool(os.getenv("SERVER_TIMING", "True"))
 
 
 class Test(Base):
@@ -0,0 +1,35 @@
+import os
+import time
+
+os.environ.setdefault("CONFIG", "config.Test")
+os.environ.setdefault("ROSETTA_API_URL", "http://rosetta.test/api/v1")
+os.environ.setdefault("WAGTAIL_API_URL", "http://wagtail.test/api/v2")
+
+import app.articles  # noqa: E402,F401 (imported before app.sources)
+import app.records  # noqa: E402,F401
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app import create_app  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    return TestClient(create_app())
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replace time.monotonic with a clock that only moves when told to."""
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
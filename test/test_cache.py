@@ -0,0 +1,94 @@
+import pytest
+
+from app import get_config
+from app.lib.api import ResourceNotFound
+from app.lib.cache import StaleWhileRevalidateCache, TTLCache, caches
+from app.sources.rosetta.api import RosettaRecordDetails, record_details_cache
+
+
+@pytest.fixture
+def cache():
+    cache = TTLCache("test", maxsize=2, ttl=60)
+    yield cache
+    del caches["test"]
+
+
+def test_least_recently_used_entries_are_evicted(cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire(cache, clock):
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=120)
+    clock.now += 60
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get_stale("a") == 1
+    clock.now += 60
+    assert cache.get("b") is None
+
+
+def test_a_maxsize_of_zero_disables_the_cache():
+    cache = TTLCache("test_disabled", maxsize=0, ttl=60)
+    del caches["test_disabled"]
+    cache.set("a", 1)
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_stale_entries_are_served_until_they_expire(clock):
+    cache = StaleWhileRevalidateCache(
+        "test_swr", maxsize=2, ttl=60, stale_after=10
+    )
+    del caches["test_swr"]
+    cache.set("a", 1)
+    assert cache.lookup("a") == (1, False)
+    clock.now += 10
+    assert cache.lookup("a") == (1, True)
+    clock.now += 50
+    assert cache.lookup("a") is None
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_records_not_found_are_cached(clock, monkeypatch):
+    calls = []
+
+    def execute(self, url):
+        calls.append(url)
+        return {"metadata": []}
+
+    monkeypatch.setattr(RosettaRecordDetails, "execute", execute)
+    for _ in range(2):
+        with pytest.raises(ResourceNotFound):
+            RosettaRecordDetails().get_result("C-not-found")
+    assert len(calls) == 1
+    clock.now += get_config().RECORD_DETAILS_NOT_FOUND_CACHE_TTL
+    with pytest.raises(ResourceNotFound):
+        RosettaRecordDetails().get_result("C-not-found")
+    assert len(calls) == 2
+    record_details_cache.clear()
+
+
+def test_cache_counters_are_served_by_the_healthcheck(client, cache):
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    cache.get("c")
+    cache.get("a")
+    response = client.get("/healthcheck/caches/")
+    assert response.status_code == 200
+    assert response.json()["test"] == {
+        "size": 2,
+        "maxsize": 2,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 1,
+        "stale_if_error_hits": 0,
+    }
@@ -0,0 +1,97 @@
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import orjson
+import pytest
+
+from app.lib.api import UpstreamError
+from app.records import routes
+from app.sources.rosetta.api import (
+    RosettaRecordDetails,
+    hierarchy_cache,
+    record_details_cache,
+)
+
+# The C1 record, whose hierarchy is C1000 > C2000
+fixture_path = Path(__file__).parent.parent / "benchmarks/fixtures"
+fetch_record = orjson.loads((fixture_path / "fetch_record.json").read_bytes())
+
+
+@pytest.fixture
+def requested(monkeypatch):
+    requested = []
+
+    async def execute_async(self, url):
+        id = parse_qs(urlparse(url).query)["id"][0]
+        requested.append(id)
+        if id == "C-error":
+            raise UpstreamError("Request to API failed")
+        if id == "C1":
+            return fetch_record
+        return {"metadata": []}
+
+    monkeypatch.setattr(RosettaRecordDetails, "execute_async", execute_async)
+    record_details_cache.clear()
+    hierarchy_cache.clear()
+    yield requested
+    record_details_cache.clear()
+    hierarchy_cache.clear()
+
+
+def test_batch_returns_each_record_or_its_error(client, requested):
+    response = client.get("/api/v1/records/batch/?ids=C1,C-missing,C-error")
+    assert response.status_code == 200
+    results = response.json()
+    assert list(results) == ["C1", "C-missing", "C-error"]
+    assert results["C1"]["id"] == "C1"
+    assert results["C-missing"] == {"error": "Record not found"}
+    assert results["C-error"] == {"error": "Record could not be retrieved"}
+
+
+def test_batch_requests_duplicate_ids_once(client, requested):
+    response = client.get("/api/v1/records/batch/?ids=C1,C-missing,C1,,C1")
+    assert response.status_code == 200
+    assert list(response.json()) == ["C1", "C-missing"]
+    assert sorted(requested) == ["C-missing", "C1"]
+
+
+def test_batch_rejects_too_many_ids(client, requested, monkeypatch):
+    monkeypatch.setattr(routes.config, "RECORD_DETAILS_BATCH_LIMIT", 2)
+    response = client.get("/api/v1/records/batch/?ids=C1,C2,C3")
+    assert response.status_code == 400
+    assert requested == []
+    # Duplicates don't count towards the limit
+    response = client.get("/api/v1/records/batch/?ids=C1,C1,C-missing")
+    assert response.status_code == 200
+
+
+def test_hierarchy_is_fetched_with_the_record(client, requested):
+    response = client.get("/api/v1/records/C1/hierarchy/")
+    assert response.status_code == 200
+    assert [level["id"] for level in response.json()] == ["C1000", "C2000"]
+    assert requested == ["C1"]
+
+
+def test_hierarchy_is_served_from_the_cached_nodes(client, requested):
+    expected = client.get("/api/v1/records/C1/hierarchy/").json()
+    record_details_cache.clear()
+    response = client.get("/api/v1/records/C1/hierarchy/")
+    assert response.json() == expected
+    # Ancestors are cached as nodes too
+    response = client.get("/api/v1/records/C2000/hierarchy/")
+    assert response.json() == expected[:1]
+    assert requested == ["C1"]
+
+
+def test_hierarchy_is_fetched_if_an_ancestor_is_not_cached(client, requested):
+    expected = client.get("/api/v1/records/C1/hierarchy/").json()
+    record_details_cache.clear()
+    del hierarchy_cache.entries["C1000"]
+    response = client.get("/api/v1/records/C1/hierarchy/")
+    assert response.json() == expected
+    assert requested == ["C1", "C1"]
+
+
+def test_hierarchy_of_a_missing_record_is_not_found(client, requested):
+    response = client.get("/api/v1/records/C-missing/hierarchy/")
+    assert response.status_code == 404
@@ -0,0 +1,117 @@
+import asyncio
+
+import orjson
+import pytest
+
+from app.lib.api import UpstreamError
+from app.sources.rosetta.api import RosettaRecordsExport
+
+
+def hit(id: str, sort: int) -> dict:
+    return {
+        "_source": {"@admin": {"id": id}, "summary": {"title": id}},
+        "sort": [sort, id],
+    }
+
+
+def export(monkeypatch, pages: list[list[dict]], total: int) -> list[str]:
+    requests = []
+
+    async def execute_async(self, url):
+        requests.append(url)
+        hits = pages[min(len(requests), len(pages)) - 1]
+        return {"metadata": hits, "stats": {"total": total}}
+
+    monkeypatch.setattr(RosettaRecordsExport, "results_per_page", 2)
+    monkeypatch.setattr(RosettaRecordsExport, "execute_async", execute_async)
+
+    async def run():
+        return [
+            record.id
+            async for batch in RosettaRecordsExport().get_batches()
+            for record in batch
+        ]
+
+    ids = asyncio.run(run())
+    assert len(requests) <= len(pages) + 1
+    return ids
+
+
+def test_export_follows_cursors(monkeypatch):
+    pages = [
+        [hit("C1", 1), hit("C2", 2)],
+        [hit("C3", 3), hit("C4", 4)],
+        [hit("C5", 5)],
+    ]
+    assert export(monkeypatch, pages, 5) == ["C1", "C2", "C3", "C4", "C5"]
+
+
+def test_export_stops_when_the_cursor_does_not_advance(monkeypatch):
+    # The same page is returned whatever the cursor
+    pages = [[hit("C1", 1), hit("C2", 2)]]
+    assert export(monkeypatch, pages, 100) == ["C1", "C2"]
+
+
+def test_export_skips_repeated_hits(monkeypatch):
+    pages = [
+        [hit("C1", 1), hit("C2", 2)],
+        [hit("C2", 2), hit("C3", 3)],
+        [hit("C3", 3), hit("C3", 3)],
+    ]
+    assert export(monkeypatch, pages, 100) == ["C1", "C2", "C3"]
+
+
+def test_export_stops_at_the_total(monkeypatch):
+    pages = [
+        [hit("C1", 1), hit("C2", 2)],
+        [hit("C3", 3), hit("C4", 4)],
+        [hit("C5", 5), hit("C6", 6)],
+    ]
+    assert export(monkeypatch, pages, 3) == ["C1", "C2", "C3"]
+
+
+@pytest.fixture
+def failing_export(monkeypatch):
+    """Serve one batch of an export, then fail."""
+    requests = []
+
+    async def execute_async(self, url):
+        requests.append(url)
+        if len(requests) > 1:
+            raise UpstreamError("Request to API failed")
+        return {"metadata": [hit("C1", 1), hit("C2", 2)], "stats": {"total": 4}}
+
+    monkeypatch.setattr(RosettaRecordsExport, "results_per_page", 2)
+    monkeypatch.setattr(RosettaRecordsExport, "execute_async", execute_async)
+
+
+def test_ndjson_export_ends_with_an_error_if_incomplete(client, failing_export):
+    response = client.get("/api/v1/records/export/")
+    assert response.status_code == 200
+    lines = [orjson.loads(line) for line in response.text.splitlines()]
+    assert [line.get("id") for line in lines[:-1]] == ["C1", "C2"]
+    assert lines[-1] == {
+        "error": "The export is incomplete as an upstream request failed"
+    }
+
+
+def test_csv_export_is_aborted_if_incomplete(client, failing_export):
+    # Starlette raises the error from the task streaming the response
+    with pytest.raises(ExceptionGroup) as error:
+        client.get("/api/v1/records/export/?format=csv")
+    assert error.group_contains(UpstreamError)
+
+
+def test_exports_are_not_compressed(client, monkeypatch):
+    pages = [[hit(f"C{i}", i) for i in range(100)]]
+    monkeypatch.setattr(RosettaRecordsExport, "results_per_page", 100)
+
+    async def execute_async(self, url):
+        return {"metadata": pages[0], "stats": {"total": 100}}
+
+    monkeypatch.setattr(RosettaRecordsExport, "execute_async", execute_async)
+    response = client.get(
+        "/api/v1/records/export/", headers={"Accept-Encoding": "gzip"}
+    )
+    assert len(response.content) > 1024
+    assert "Content-Encoding" not in response.headers
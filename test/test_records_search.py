@@ -0,0 +1,135 @@
+import asyncio
+import urllib.parse
+
+import orjson
+import pytest
+
+from app import get_config
+from app.lib.metrics import parse_duration
+from app.records.schemas.search import cursor_omitted_fields
+from app.sources.rosetta.api import (
+    RosettaRecordsSearch,
+    RosettaRecordsSearchStats,
+    encode_cursor,
+)
+
+config = get_config()
+
+
+def hit(number: int) -> dict:
+    return {
+        "_source": {"@admin": {"id": f"C{number}"}, "summary": {"title": ""}},
+        "sort": [number],
+    }
+
+
+@pytest.fixture
+def numbered_search(monkeypatch):
+    """Serve 12,000 numbered results, by offset or after a cursor."""
+    total = 12000
+
+    async def execute_async(self, url):
+        params = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)
+        size = int(params["size"][0])
+        if "searchAfter" in params:
+            start = orjson.loads(params["searchAfter"][0])[0] + 1
+        else:
+            start = int(params["from"][0])
+        return {
+            "metadata": [
+                hit(number) for number in range(start, min(start + size, total))
+            ],
+            "stats": {"total": total},
+        }
+
+    async def get_stats(self):
+        return {}
+
+    monkeypatch.setattr(RosettaRecordsSearch, "execute_async", execute_async)
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "get_result_async", get_stats
+    )
+    monkeypatch.setattr(RosettaRecordsSearch, "results_per_page", 1000)
+    return total
+
+
+def test_cursors_walk_past_the_results_limit(client, numbered_search):
+    ids = []
+    query = {"q": "numbered"}
+    while True:
+        response = client.get("/api/v1/records/", params=query)
+        assert response.status_code == 200
+        body = response.json()
+        ids.extend(result["id"] for result in body["results"])
+        if "cursor" in query:
+            # Pages reached with a cursor aren't numbered
+            assert not set(cursor_omitted_fields) & set(body)
+        if not (cursor := body["next_cursor"]):
+            break
+        query["cursor"] = cursor
+    assert ids == [f"C{number}" for number in range(numbered_search)]
+    assert len(ids) > config.ELASTICSEARCH_RESULTS_LIMIT
+
+
+def test_page_is_ignored_with_a_cursor(client, numbered_search):
+    cursor = encode_cursor([10999])
+    responses = [
+        client.get(
+            "/api/v1/records/",
+            params={"q": "numbered", "cursor": cursor} | page,
+        )
+        for page in ({}, {"page": 3}, {"page": 600})
+    ]
+    assert all(response.status_code == 200 for response in responses)
+    bodies = [response.json() for response in responses]
+    assert bodies[0] == bodies[1] == bodies[2]
+    assert bodies[0]["results"][0]["id"] == "C11000"
+    assert "page" not in bodies[0]
+
+
+def test_offset_pages_are_numbered(client, numbered_search):
+    body = client.get(
+        "/api/v1/records/", params={"q": "numbered", "page": 3}
+    ).json()
+    assert body["page"] == 3
+    assert body["result_range_min"] == 2001
+    assert body["result_range_max"] == 3000
+    assert body["results"][0]["id"] == "C2000"
+
+
+def test_combined_results_are_reused_until_the_counts_change(monkeypatch):
+    counts = {"tna": 10}
+
+    async def execute_async(self, url):
+        return {"metadata": [], "stats": {"total": 100}}
+
+    async def get_stats(self):
+        return dict(counts)
+
+    monkeypatch.setattr(RosettaRecordsSearch, "execute_async", execute_async)
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "get_result_async", get_stats
+    )
+
+    def get_result():
+        api = RosettaRecordsSearch()
+        api.add_query("combined results")
+        return asyncio.run(api.get_result_async())
+
+    first = get_result()
+    assert get_result() is first
+    counts["tna"] = 11
+    changed = get_result()
+    assert changed is not first
+    assert changed.content["results_stats"] == {"tna": 11}
+    assert changed.etag != first.etag
+
+
+def test_search_result_parse_duration_is_observed():
+    def observed() -> int:
+        return parse_duration.collect().get(("search_result",), [0])[-1]
+
+    before = observed()
+    raw_results = {"metadata": [hit(1), hit(2)], "stats": {"total": 2}}
+    RosettaRecordsSearch().parse_results(raw_results, 1, "")
+    assert observed() == before + 2
@@ -0,0 +1,23 @@
+import io
+import logging
+
+from fastapi.testclient import TestClient
+
+from app import create_app
+
+
+def test_requests_are_logged():
+    client = TestClient(create_app())
+    stream = io.StringIO()
+    # pytest adds its own capturing handlers alongside the app's
+    handler = next(
+        handler
+        for handler in logging.getLogger("app").handlers
+        if type(handler) is logging.StreamHandler
+    )
+    previous = handler.setStream(stream)
+    try:
+        client.get("/healthcheck/live/")
+    finally:
+        handler.setStream(previous)
+    assert "app.requests - GET /healthcheck/live/ 200" in stream.getvalue()
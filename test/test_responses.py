@@ -0,0 +1,137 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.lib.responses import (
+    GZipMiddleware,
+    compressors,
+    Payload,
+    negotiate_encoding,
+    payload_response,
+)
+from app.sources.rosetta.api import (
+    RosettaRecordsSearch,
+    RosettaRecordsSearchStats,
+)
+
+# Brotli is an optional extra
+brotli = pytest.mark.skipif("br" not in compressors, reason="needs brotli")
+
+# Large enough to be compressed
+payload = Payload({"items": ["An item in the payload"] * 100})
+
+
+@pytest.fixture
+def payload_client():
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+    @app.get("/")
+    def route(request: Request):
+        return payload_response(request, payload, "public, max-age=60")
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("GZIP", "gzip"),
+        ("br", "br"),
+        # Brotli is preferred between equals
+        ("gzip, br", "br"),
+        ("gzip;q=1.0, br;q=0.5", "gzip"),
+        ("br;q=0, gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("*", "br"),
+        ("*;q=0.5, gzip", "gzip"),
+        ("*, br;q=0", "gzip"),
+        ("gzip;q=nonsense", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding, encoding):
+    assert negotiate_encoding(accept_encoding, ["br", "gzip"]) == encoding
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("identity", None),
+        ("gzip", "gzip"),
+        pytest.param("br, gzip", "br", marks=brotli),
+    ],
+)
+def test_each_encoding_has_its_own_etag(
+    payload_client, accept_encoding, encoding
+):
+    response = payload_client.get(
+        "/", headers={"Accept-Encoding": accept_encoding}
+    )
+    assert response.status_code == 200
+    assert response.headers.get("Content-Encoding") == encoding
+    suffix = f"-{encoding}" if encoding else ""
+    assert response.headers["ETag"] == f'{payload.etag[:-1]}{suffix}"'
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert response.json() == payload.content
+
+
+@pytest.mark.parametrize(
+    "suffix", ["", "-gzip", pytest.param("-br", marks=brotli)]
+)
+@pytest.mark.parametrize(
+    "accept_encoding",
+    ["identity", "gzip", pytest.param("br", marks=brotli)],
+)
+def test_any_encodings_etag_revalidates(
+    payload_client, suffix, accept_encoding
+):
+    response = payload_client.get(
+        "/",
+        headers={
+            "Accept-Encoding": accept_encoding,
+            "If-None-Match": f'"other", W/{payload.etag[:-1]}{suffix}"',
+        },
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+    # The ETag of the representation that would have been sent
+    expected_suffix = "" if accept_encoding == "identity" else accept_encoding
+    assert response.headers["ETag"].endswith(f'{expected_suffix}"')
+
+
+def test_other_etags_do_not_revalidate(payload_client):
+    response = payload_client.get(
+        "/", headers={"If-None-Match": f'{payload.etag[:-1]}-deflate"'}
+    )
+    assert response.status_code == 200
+
+
+def test_combined_search_results_etag_matches_their_encoding(
+    client, monkeypatch
+):
+    # The page alone is too small to compress, but not with the counts
+    async def execute_async(self, url):
+        return {"metadata": [], "stats": {"total": 0}}
+
+    async def get_stats(self):
+        return {f"group-{number}": number for number in range(100)}
+
+    monkeypatch.setattr(RosettaRecordsSearch, "execute_async", execute_async)
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "get_result_async", get_stats
+    )
+    identity = client.get(
+        "/api/v1/records/?q=near+threshold",
+        headers={"Accept-Encoding": "identity"},
+    )
+    gzipped = client.get(
+        "/api/v1/records/?q=near+threshold",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "Content-Encoding" not in identity.headers
+    assert gzipped.headers["Content-Encoding"] == "gzip"
+    assert gzipped.headers["ETag"] == f'{identity.headers["ETag"][:-1]}-gzip"'
+    assert identity.json() == gzipped.json()
@@ -0,0 +1,42 @@
+import asyncio
+
+from app.lib import tasks
+from app.lib.api import UpstreamError
+from app.sources.rosetta import api
+from app.sources.rosetta.api import RosettaRecordsSearchStats
+
+
+def test_failed_group_count_after_timeout_is_handled(monkeypatch):
+    monkeypatch.setattr(api.config, "RESULTS_STATS_TIMEOUT", 0.01)
+
+    async def execute_async(self, url):
+        await asyncio.sleep(0.05)
+        raise UpstreamError("Request to API failed")
+
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "execute_async", execute_async
+    )
+
+    async def run():
+        stats = RosettaRecordsSearchStats("failing count")
+        count = await stats.get_group_count_async("tna")
+        background = list(tasks.background_tasks)
+        await asyncio.gather(*background)
+        return count, background
+
+    count, background = asyncio.run(run())
+    assert count is None
+    # The count failed after the response gave up on it, so nothing else can
+    # retrieve its exception
+    assert background and all(task.exception() is None for task in background)
+
+
+def test_failed_group_count_within_timeout_is_none(monkeypatch):
+    async def execute_async(self, url):
+        raise UpstreamError("Request to API failed")
+
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "execute_async", execute_async
+    )
+    stats = RosettaRecordsSearchStats("failing count now")
+    assert asyncio.run(stats.get_group_count_async("tna")) is None
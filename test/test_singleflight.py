@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app.lib.singleflight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"id": "C1"}
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            *[flights.do("C1", fetch) for _ in range(5)]
+        )
+        return flights, results
+
+    flights, results = asyncio.run(main())
+    assert len(calls) == 1
+    assert results == [{"id": "C1"}] * 5
+    assert flights.calls == {}
+
+
+def test_cancelling_a_caller_does_not_cancel_the_call():
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def main():
+        flights = SingleFlight()
+        cancelled = asyncio.ensure_future(flights.do("C1", fetch))
+        waiting = asyncio.ensure_future(flights.do("C1", fetch))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return await waiting
+
+    assert asyncio.run(main()) == "done"
+
+
+def test_errors_reach_every_caller_and_are_not_shared_afterwards():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        if len(calls) == 1:
+            raise ConnectionError("Request failed")
+        return "done"
+
+    async def main():
+        flights = SingleFlight()
+        results = await asyncio.gather(
+            *[flights.do("C1", fetch) for _ in range(3)],
+            return_exceptions=True,
+        )
+        assert flights.calls == {}
+        return results, await flights.do("C1", fetch)
+
+    results, retried = asyncio.run(main())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert retried == "done"
+    assert len(calls) == 2
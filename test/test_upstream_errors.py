@@ -0,0 +1,100 @@
+import asyncio
+import math
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import create_app, get_config
+from app.lib.api import UpstreamError
+from app.lib.responses import Payload
+from app.lib.upstreams import Upstream, upstreams
+from app.sources.rosetta.api import (
+    RosettaRecordDetails,
+    RosettaRecordsSearch,
+    RosettaRecordsSearchStats,
+    record_details_cache,
+    search_results_cache,
+)
+
+
+def test_upstream_errors_are_bad_gateways(client, monkeypatch):
+    async def execute_async(self, url):
+        raise UpstreamError("Request to http://10.0.0.1:9200/fetch failed")
+
+    monkeypatch.setattr(RosettaRecordDetails, "execute_async", execute_async)
+    response = client.get("/api/v1/records/upstream-error/")
+    assert response.status_code == 502
+    assert response.json() == {"detail": "The upstream API request failed"}
+
+
+def test_other_connection_errors_are_not_upstream_errors(monkeypatch):
+    async def execute_async(self, url):
+        raise ConnectionResetError("Connection reset by 10.0.0.1:9200")
+
+    async def get_stats(self):
+        return {}
+
+    monkeypatch.setattr(RosettaRecordsSearch, "execute_async", execute_async)
+    monkeypatch.setattr(
+        RosettaRecordsSearchStats, "get_result_async", get_stats
+    )
+    client = TestClient(create_app(), raise_server_exceptions=False)
+    response = client.get("/api/v1/records/?q=connection+reset")
+    assert response.status_code == 500
+    assert "10.0.0.1" not in response.text
+
+
+def test_expired_details_are_served_stale_if_the_upstream_fails(
+    client, monkeypatch
+):
+    async def execute_async(self, url):
+        raise UpstreamError("Request to API failed")
+
+    monkeypatch.setattr(RosettaRecordDetails, "execute_async", execute_async)
+    record_details_cache.set("C-stale", Payload({"id": "C-stale"}), ttl=-1)
+    response = client.get("/api/v1/records/C-stale/")
+    assert response.status_code == 200
+    assert response.json() == {"id": "C-stale", "stale": True}
+    assert response.headers["Cache-Control"] == "no-cache"
+
+
+def test_expired_search_is_served_stale_if_the_upstream_fails(monkeypatch):
+    async def execute_async(self, url):
+        raise UpstreamError("Request to API failed")
+
+    monkeypatch.setattr(RosettaRecordsSearch, "execute_async", execute_async)
+    api = RosettaRecordsSearch()
+    api.add_query("stale search")
+    api.build_page_url(1)
+    search_results_cache.set(
+        api.cache_key(), Payload({"count": 1, "page": 1}), ttl=-1
+    )
+    result = asyncio.run(api.get_page_async(1))
+    assert result.content == {"count": 1, "page": 1, "stale": True}
+
+
+def test_stale_result_raises_the_error_without_a_stale_result():
+    error = UpstreamError("Request to API failed")
+    with pytest.raises(UpstreamError) as raised:
+        RosettaRecordDetails().get_stale_result("C-never-cached", error)
+    assert raised.value is error
+    with pytest.raises(UpstreamError) as raised:
+        RosettaRecordsSearch().get_stale_result(("never cached",), error)
+    assert raised.value is error
+
+
+def test_open_circuit_is_unavailable_with_retry_after(client):
+    upstream = Upstream("rosetta", "http://rosetta.test", get_config())
+    upstream.open()
+    upstream.breaker.open()
+    upstreams["rosetta"] = upstream
+    try:
+        response = client.get("/api/v1/records/C-unavailable/")
+    finally:
+        del upstreams["rosetta"]
+        asyncio.run(upstream.close())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(
+        math.ceil(get_config().CIRCUIT_BREAKER_OPEN_DURATION)
+    )
+    assert response.json() == {"detail": "The rosetta API is unavailable"}
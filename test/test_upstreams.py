@@ -0,0 +1,141 @@
+import asyncio
+import itertools
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app import get_config
+from app.lib.upstreams import (
+    Budget,
+    CircuitBreaker,
+    LatencyTracker,
+    Upstream,
+)
+
+
+@pytest.fixture
+def unavailable_url():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(
+        target=server.serve_forever, args=(0.01,), daemon=True
+    )
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/search", requests
+    server.shutdown()
+    server.server_close()
+
+
+def open_upstream(balance: float) -> Upstream:
+    upstream = Upstream("rosetta", "", get_config())
+    upstream.retries = 2
+    upstream.retry_backoff = 0
+    upstream.retry_budget.ratio = 0
+    upstream.retry_budget.balance = balance
+    upstream.open()
+    return upstream
+
+
+@pytest.mark.parametrize("balance, attempts", [(0, 1), (1, 2), (10, 3)])
+def test_blocking_retries_spend_the_retry_budget(
+    unavailable_url, balance, attempts
+):
+    url, requests = unavailable_url
+    upstream = open_upstream(balance)
+    try:
+        response = upstream.get_sync(url)
+    finally:
+        upstream.session.close()
+    assert response.status_code == 503
+    assert len(requests) == attempts
+
+
+def make_breaker() -> CircuitBreaker:
+    return CircuitBreaker(
+        failure_rate=0.5,
+        slow_call_duration=1,
+        min_calls=4,
+        window=4,
+        open_duration=10,
+    )
+
+
+def test_breaker_opens_then_closes_after_a_successful_probe(clock):
+    breaker = make_breaker()
+    for success, duration in ((True, 0.1), (False, 0.1), (True, 0.1)):
+        breaker.record(success, duration)
+        assert breaker.state == "closed"
+    # A slow call counts as a failure, which makes half of the window
+    breaker.record(True, 2)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.retry_after() == 10
+
+    clock.now += 10
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # Only one probe at a time
+    assert not breaker.allow()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_reopens_after_a_failed_probe(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record(False, 0.1)
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 10
+    assert breaker.allow()
+
+
+def test_hedging_keeps_the_p95_latency(monkeypatch):
+    # One in ten attempts is slow, taking 20-60ms
+    attempts = itertools.count()
+
+    async def get_once(self, url):
+        start = time.perf_counter()
+        if (attempt := next(attempts)) % 10:
+            await asyncio.sleep(0.001)
+        else:
+            await asyncio.sleep(0.02 + 0.01 * (attempt // 10 % 5))
+        self.latencies.add(time.perf_counter() - start)
+        return httpx.Response(200)
+
+    monkeypatch.setattr(Upstream, "get_once", get_once)
+    upstream = Upstream("rosetta", "", get_config())
+    upstream.hedge = True
+    upstream.hedge_budget = Budget(1)
+    upstream.latencies = LatencyTracker(size=100, min_samples=50)
+
+    async def run():
+        for _ in range(12):
+            await asyncio.gather(*[upstream.get_hedged("") for _ in range(50)])
+            p95s.append(upstream.latencies.percentile(0.95))
+
+    p95s = []
+    asyncio.run(run())
+    # Hedges are sent from the second batch, once there are enough samples.
+    # The slowest tenth of attempts keeps the 95th percentile above 30ms.
+    assert all(p95 >= 0.03 for p95 in p95s)
@@ -0,0 +1,26 @@
+import asyncio
+
+from app.sources import website
+from app.sources.website import WebsiteArticles, get_child_pages
+
+
+def test_child_pages_are_fetched_a_few_at_a_time(monkeypatch):
+    in_flight = 0
+    most_in_flight = 0
+
+    async def execute_async(self, url):
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.001)
+        in_flight -= 1
+        offset = self.params["offset"]
+        return {
+            "meta": {"total_count": 20 * self.results_per_page},
+            "items": [{"title": f"Page {offset}", "id": offset}],
+        }
+
+    monkeypatch.setattr(WebsiteArticles, "execute_async", execute_async)
+    children = asyncio.run(get_child_pages(1))
+    assert len(children) == 20
+    assert most_in_flight == website.max_child_page_requests